@@ -1,4 +1,17 @@
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.ndimage import uniform_filter1d
+from scipy.signal import zoom_fft
+
+from .fft_backend import fft, ifft, next_fast_len, scratch
+
+# number of complex cells a vectorized CAF builds at once before the lag
+# axis is split into chunks
+CHUNK_ELEMENTS = 2**22
+
+# off-peak CAF magnitudes are close to Rayleigh distributed, whose median is
+# this fraction of its mean, so a running mean stands in for np.median
+_RAYLEIGH_MEDIAN_PER_MEAN = np.sqrt(4 * np.log(2) / np.pi)
 
 def naive_caf(sig1, sig2, max_time_shift, max_freq_shift, num_freqs = 51):
     assert len(sig1) == len(sig2), "Signals must be the same length."
@@ -25,53 +38,90 @@ def naive_caf(sig1, sig2, max_time_shift, max_freq_shift, num_freqs = 51):
 
     return caf_out, time_shift, freq_shift
 
-def fft_caf(sig1, sig2, max_time_shift):
+def fft_caf(sig1, sig2, max_time_shift, vectorized = True, lag_chunk = None, dtype = None, max_freq_shift = None):
     assert len(sig1) == len(sig2), "Signals must be the same length."
+    sig1, sig2 = _working_precision(sig1, sig2, dtype)
 
     K = len(sig1)
     time_shifts = np.arange(-max_time_shift, max_time_shift + 1)
     
-    caf_out = np.zeros((K, len(time_shifts)), dtype = np.complex128)
+    caf_out = np.zeros((K, len(time_shifts)), dtype = sig1.dtype)
 
-    for i, tshift in enumerate(time_shifts):
-        sig2_shifted = np.roll(sig2, -tshift).conj()
-        caf = np.fft.fft(sig1 * sig2_shifted)
-        caf_out[:, i] = caf
+    if vectorized:
+        lag_chunk = lag_chunk or _lag_chunk(K)
+        for start in range(0, len(time_shifts), lag_chunk):
+            stop = min(start + lag_chunk, len(time_shifts))
+            products = _lag_products(sig1, sig2, time_shifts[start:stop], out = scratch((stop - start, K), sig1.dtype))
+            caf_out[:, start:stop] = fft(products, axis = -1, overwrite_x = True).T
+    else:
+        for i, tshift in enumerate(time_shifts):
+            sig2_shifted = np.roll(sig2, -tshift).conj()
+            caf = fft(sig1 * sig2_shifted)
+            caf_out[:, i] = caf
     
-    max_ind = np.unravel_index(np.argmax(np.abs(caf_out)), caf_out.shape)
+    caf_mag = np.abs(caf_out)
+    # optionally only search frequency shifts inside +-max_freq_shift (cycles / sample)
+    if max_freq_shift is not None:
+        search_mag = np.where(_freq_window(K, max_freq_shift)[:, None], caf_mag, 0)
+    else:
+        search_mag = caf_mag
+    max_ind = np.unravel_index(np.argmax(search_mag), caf_out.shape)
 
     time_shift  = time_shifts[max_ind[1]]
     # freq_shift = (K - max_ind[0]) % K / K
     freq_shift = (((max_ind[0] + (K // 2)) % K) - (K // 2)) / K
 
-    max_mag = np.max(np.abs(caf_out))
-    median_mag = np.median(np.abs(caf_out))
+    max_mag = search_mag[max_ind]
+    median_mag = np.median(caf_mag)
 
     return caf_out, time_shift, freq_shift, max_mag, median_mag
 
-def convolution_caf(sig1, sig2, num_freq_shifts = 51):
+def convolution_caf(sig1, sig2, num_freq_shifts = 51, vectorized = True, max_time_shift = None, freq_chunk = None, dtype = None):
     assert len(sig1) == len(sig2), "Signals must be the same length."
+    sig1, sig2 = _working_precision(sig1, sig2, dtype)
 
     K = len(sig1)
 
-    freq_sig1 = np.fft.fft(sig1)
-    freq_sig2 = np.fft.fft(sig2)
+    freq_sig1 = fft(sig1)
+    freq_sig2 = fft(sig2)
     freq_sig2_conj = freq_sig2.conj()
 
     half_shifts = num_freq_shifts // 2
-    caf_out = np.zeros((num_freq_shifts, K), dtype = np.complex128)
 
-    for ind in range(num_freq_shifts):
-        i = ind - half_shifts  
-        # sig1_shifted = np.roll(freq_sig1, i)
-        sig1_shifted = freq_sig1
-        sig2_shifted = np.roll(freq_sig2_conj, -2*i)
-        caf = np.fft.ifft(sig1_shifted * sig2_shifted)
-        caf_out[ind, :] = caf
+    # optionally keep only the columns of a +-max_time_shift lag window,
+    # time shift t sits in column (-t) % K of the full output
+    if max_time_shift is not None:
+        time_shifts = np.arange(-max_time_shift, max_time_shift + 1)
+        lag_inds = (-time_shifts) % K
+        caf_out = np.zeros((num_freq_shifts, len(time_shifts)), dtype = sig1.dtype)
+    else:
+        lag_inds = slice(None)
+        caf_out = np.zeros((num_freq_shifts, K), dtype = sig1.dtype)
+
+    if vectorized:
+        # row ind of the gather is np.roll(freq_sig2_conj, -2*i)
+        freq_chunk = freq_chunk or _lag_chunk(K)
+        for start in range(0, num_freq_shifts, freq_chunk):
+            stop = min(start + freq_chunk, num_freq_shifts)
+            shifts = 2 * (np.arange(start, stop) - half_shifts)
+            products = np.take(freq_sig2_conj, (np.arange(K) + shifts[:, None]) % K, out = scratch((stop - start, K), sig1.dtype))
+            np.multiply(freq_sig1, products, out = products)
+            caf_out[start:stop] = ifft(products, axis = -1, overwrite_x = True)[:, lag_inds]
+    else:
+        for ind in range(num_freq_shifts):
+            i = ind - half_shifts  
+            # sig1_shifted = np.roll(freq_sig1, i)
+            sig1_shifted = freq_sig1
+            sig2_shifted = np.roll(freq_sig2_conj, -2*i)
+            caf = ifft(sig1_shifted * sig2_shifted)
+            caf_out[ind, :] = caf[lag_inds]
 
     max_ind = np.unravel_index(np.argmax(np.abs(caf_out)), caf_out.shape)
 
-    time_shift  = (K - max_ind[1]) % K - K
+    if max_time_shift is not None:
+        time_shift = time_shifts[max_ind[1]]
+    else:
+        time_shift  = (K - max_ind[1]) % K - K
     # time_shift = (max_ind[1] - K // 2) % K if max_ind[1] >= K // 2 else (max_ind[1] + K // 2) % K
 
     freq_shift = (max_ind[0] - half_shifts) / K * 2  
@@ -79,4 +129,668 @@ def convolution_caf(sig1, sig2, num_freq_shifts = 51):
     max_mag = np.max(np.abs(caf_out))
     median_mag = np.median(np.abs(caf_out))
 
-    return caf_out, time_shift, -freq_shift, max_mag, median_mag
\ No newline at end of file
+    return caf_out, time_shift, -freq_shift, max_mag, median_mag
+
+def batched_fft_caf(ref_sig, sigs, max_time_shift, lag_chunk = None, dtype = None, fast_len = False, max_freq_shift = None):
+    """
+    Computes the FFT CAF between one reference signal and a stack of other
+    signals in a single vectorized pass, keeping only the peak of each surface.
+
+    params:
+        ref_sig: Reference signal, shape (K,)
+        sigs: Stacked signals of the other receivers, shape (N, K)
+        max_time_shift: Largest time shift (in samples) to search, either one
+            value or one per pair
+        lag_chunk: Number of time shifts to transform per batch, sized from
+            CHUNK_ELEMENTS when not given
+        dtype: Complex dtype to compute in, complex64 inputs stay in single
+            precision when not given
+        fast_len: Zero pad the frequency axis to the next fast FFT length,
+            which only makes the frequency grid finer
+        max_freq_shift: Largest frequency shift (cycles / sample) to search,
+            either one value or one per pair, all frequencies when not given
+    returns:
+        Per-pair time shifts (samples), frequency shifts (cycles / sample),
+        peak magnitudes and median estimates, each of shape (N,). A median
+        estimate is scaled from the mean magnitude of the surface as if it
+        were Rayleigh distributed, not the exact np.median fft_caf returns.
+    """
+    ref_sig, sigs = _working_precision(ref_sig, np.atleast_2d(sigs), dtype)
+    assert sigs.shape[1] == len(ref_sig), "Signals must be the same length."
+
+    N, K = sigs.shape
+    # pairs share the widest lag window, cells outside a pair's own window are skipped
+    pair_time_shifts = np.broadcast_to(max_time_shift, (N,))
+    time_shifts = np.arange(-np.max(pair_time_shifts), np.max(pair_time_shifts) + 1)
+
+    max_mags = np.zeros(N)
+    max_freq_inds = np.zeros(N, dtype = int)
+    max_time_inds = np.zeros(N, dtype = int)
+    mag_sums = np.zeros(N)
+
+    n_fft = next_fast_len(K) if fast_len else K
+    if max_freq_shift is not None:
+        freq_windows = np.array([_freq_window(n_fft, f) for f in np.broadcast_to(max_freq_shift, (N,))])
+
+    lag_chunk = lag_chunk or _lag_chunk(N * n_fft)
+    for start in range(0, len(time_shifts), lag_chunk):
+        stop = min(start + lag_chunk, len(time_shifts))
+        products = _lag_products(ref_sig, sigs, time_shifts[start:stop], out = scratch((N, stop - start, K), ref_sig.dtype))
+        caf_mag = np.abs(fft(products, n = n_fft, axis = -1, overwrite_x = True))
+        mag_sums += caf_mag.sum(axis = (1, 2))
+
+        caf_mag[np.abs(time_shifts[start:stop]) > pair_time_shifts[:, None]] = 0
+        if max_freq_shift is not None:
+            caf_mag *= freq_windows[:, None, :]
+        caf_mag = caf_mag.reshape(N, -1)
+
+        flat_inds = np.argmax(caf_mag, axis = 1)
+        mags = caf_mag[np.arange(N), flat_inds]
+        better = mags > max_mags
+        max_mags[better] = mags[better]
+        max_time_inds[better] = start + flat_inds[better] // n_fft
+        max_freq_inds[better] = flat_inds[better] % n_fft
+
+    time_shift = time_shifts[max_time_inds]
+    freq_shift = (((max_freq_inds + (n_fft // 2)) % n_fft) - (n_fft // 2)) / n_fft
+    median_ests = _RAYLEIGH_MEDIAN_PER_MEAN * mag_sums / (n_fft * len(time_shifts))
+
+    return time_shift, freq_shift, max_mags, median_ests
+
+def fft_caf_peaks(sig1, sig2, max_time_shift, top_k = 5, lag_chunk = None, dtype = None, fast_len = False, max_freq_shift = None):
+    """
+    Peak-only version of fft_caf. The surface is computed a chunk of time
+    shifts at a time while the strongest cells and a running mean of the
+    magnitude are kept, so the full surface is never stored or sorted.
+
+    params:
+        sig1: First signal
+        sig2: Second signal
+        max_time_shift: Largest time shift (in samples) to search
+        top_k: Number of strongest cells to return
+        lag_chunk: Number of time shifts to transform per batch, sized from
+            CHUNK_ELEMENTS when not given
+        dtype: Complex dtype to compute in, complex64 inputs stay in single
+            precision when not given
+        fast_len: Zero pad the frequency axis to the next fast FFT length,
+            which only makes the frequency grid finer
+        max_freq_shift: Largest frequency shift (cycles / sample) to search,
+            all frequencies when not given
+    returns:
+        Time shift (samples), frequency shift (cycles / sample), peak magnitude,
+        median estimate, and a (top_k, 3) array of the strongest cells as
+        (time shift, frequency shift, magnitude) rows, strongest first. The
+        median estimate is scaled from the mean magnitude as if the surface
+        were Rayleigh distributed, not the exact np.median fft_caf returns.
+    """
+    assert len(sig1) == len(sig2), "Signals must be the same length."
+    sig1, sig2 = _working_precision(sig1, sig2, dtype)
+
+    K = len(sig1)
+    n_fft = next_fast_len(K) if fast_len else K
+    time_shifts = np.arange(-max_time_shift, max_time_shift + 1)
+    top_k = min(top_k, n_fft * len(time_shifts))
+
+    top_mags = np.full(top_k, -1.0)
+    top_inds = np.zeros(top_k, dtype = int)
+    mag_sum = 0.0
+
+    lag_chunk = lag_chunk or _lag_chunk(n_fft)
+    for start in range(0, len(time_shifts), lag_chunk):
+        stop = min(start + lag_chunk, len(time_shifts))
+        products = _lag_products(sig1, sig2, time_shifts[start:stop], out = scratch((stop - start, K), sig1.dtype))
+        caf_mag = np.abs(fft(products, n = n_fft, axis = -1, overwrite_x = True))
+        mag_sum += caf_mag.sum()
+
+        if max_freq_shift is not None:
+            caf_mag *= _freq_window(n_fft, max_freq_shift)
+        caf_mag = caf_mag.ravel()
+
+        # indices into the (time shift, frequency) surface, offset by the chunk start
+        chunk_inds = np.argpartition(caf_mag, -min(top_k, len(caf_mag)))[-top_k:]
+        merged_mags = np.concatenate((top_mags, caf_mag[chunk_inds]))
+        merged_inds = np.concatenate((top_inds, start * n_fft + chunk_inds))
+        keep = np.argpartition(merged_mags, -top_k)[-top_k:]
+        top_mags, top_inds = merged_mags[keep], merged_inds[keep]
+
+    order = np.argsort(top_mags)[::-1]
+    top_mags, top_inds = top_mags[order], top_inds[order]
+
+    peak_time_shifts = time_shifts[top_inds // n_fft]
+    peak_freq_shifts = ((((top_inds % n_fft) + (n_fft // 2)) % n_fft) - (n_fft // 2)) / n_fft
+    peaks = np.column_stack((peak_time_shifts, peak_freq_shifts, top_mags))
+
+    median_est = _RAYLEIGH_MEDIAN_PER_MEAN * mag_sum / (n_fft * len(time_shifts))
+
+    return peak_time_shifts[0], peak_freq_shifts[0], top_mags[0], median_est, peaks
+
+def all_pairs_caf(sigs, max_time_shift, max_freq_shift, pairs = None, dtype = None):
+    """
+    CAF peaks of every pair of receivers. Each signal is transformed once and
+    its spectrum reused by every pair it is part of. A pair's CAF at Doppler
+    bin d is the inverse FFT of its frequency shifted spectrum times the other
+    conjugated spectrum, so only the bins of the Doppler window cost an IFFT.
+
+    params:
+        sigs: Stacked signals of all receivers, shape (N, K)
+        max_time_shift: Largest time shift (in samples) to search, either one
+            value or one per pair
+        max_freq_shift: Largest frequency shift (cycles / sample) to search,
+            either one value or one per pair
+        pairs: List of (i, j) receiver index pairs, all N(N-1)/2 pairs when not given
+        dtype: Complex dtype to compute in, complex64 inputs stay in single
+            precision when not given
+    returns:
+        Pairs (P, 2) and per-pair time shifts (samples), frequency shifts
+        (cycles / sample) and peak magnitudes, with the same sign convention
+        as fft_caf(sigs[i], sigs[j], ...)
+    """
+    sigs = np.atleast_2d(sigs)
+    sigs = sigs.astype(dtype or np.result_type(sigs, np.complex64), copy = False)
+    N, K = sigs.shape
+    if pairs is None:
+        pairs = [(i, j) for i in range(N) for j in range(i + 1, N)]
+    pairs = np.array(pairs, dtype = int).reshape(-1, 2)
+    P = len(pairs)
+
+    pair_time_shifts = np.broadcast_to(max_time_shift, (P,))
+    pair_freq_shifts = np.broadcast_to(max_freq_shift, (P,))
+
+    # one FFT per receiver, shared by all of its pairs
+    spectra = fft(sigs, axis = -1)
+    spectra_conj = spectra.conj()
+
+    time_shift = np.zeros(P, dtype = int)
+    freq_shift = np.zeros(P)
+    max_mags = np.zeros(P)
+
+    for p, (i, j) in enumerate(pairs):
+        time_shifts = np.arange(-pair_time_shifts[p], pair_time_shifts[p] + 1)
+        max_bin = int(np.ceil(pair_freq_shifts[p] * K))
+        freq_bins = np.arange(-max_bin, max_bin + 1)
+
+        # row d is the spectrum of sigs[i] * exp(-2j pi d n / K), and time
+        # shift t of the correlation sits in column (-t) % K of the IFFT
+        products = np.take(spectra[i], (np.arange(K) + freq_bins[:, None]) % K, out = scratch((len(freq_bins), K), sigs.dtype))
+        np.multiply(products, spectra_conj[j], out = products)
+        caf_mag = np.abs(ifft(products, axis = -1, overwrite_x = True)[:, (-time_shifts) % K])
+
+        max_ind = np.unravel_index(np.argmax(caf_mag), caf_mag.shape)
+        time_shift[p] = time_shifts[max_ind[1]]
+        freq_shift[p] = freq_bins[max_ind[0]] / K
+        max_mags[p] = caf_mag[max_ind]
+
+    return pairs, time_shift, freq_shift, max_mags
+
+def gcc(sigs, max_time_shift, pairs = None, weighting = 'phat', smoothing = 64, dtype = None):
+    """
+    Generalized cross-correlation TDOA of receiver pairs, for when no FDOA is
+    needed. Every signal is transformed once and every pair costs one IFFT,
+    instead of the full CAF surface. The signals are zero padded so the
+    correlation is linear rather than circular over the searched lags.
+
+    params:
+        sigs: Stacked signals of all receivers, shape (N, K)
+        max_time_shift: Largest time shift (in samples) to search, either one
+            value or one per pair
+        pairs: List of (i, j) receiver index pairs, all N(N-1)/2 pairs when not given
+        weighting: 'plain' for the unweighted cross-correlation, 'phat' to
+            whiten the cross spectrum, 'scot' to divide it by the geometric
+            mean of the smoothed auto spectra
+        smoothing: Width in FFT bins of the moving average applied to the
+            auto spectra for 'scot'
+        dtype: Complex dtype to compute in, complex64 inputs stay in single
+            precision when not given
+    returns:
+        Pairs (P, 2), fractional time shifts (samples) with the same sign
+        convention as fft_caf(sigs[i], sigs[j], ...) and correlation peak magnitudes
+    """
+    if weighting not in ('plain', 'phat', 'scot'):
+        raise ValueError(f"Unknown GCC weighting: {weighting}")
+
+    sigs = np.atleast_2d(sigs)
+    sigs = sigs.astype(dtype or np.result_type(sigs, np.complex64), copy = False)
+    N, K = sigs.shape
+    if pairs is None:
+        pairs = [(i, j) for i in range(N) for j in range(i + 1, N)]
+    pairs = np.array(pairs, dtype = int).reshape(-1, 2)
+
+    pair_time_shifts = np.broadcast_to(max_time_shift, (len(pairs),))
+    n_fft = next_fast_len(K + int(np.max(pair_time_shifts)))
+    spectra = fft(sigs, n = n_fft, axis = -1)
+
+    if weighting == 'scot':
+        # single snapshot auto spectra would make SCOT identical to PHAT
+        power = uniform_filter1d(np.abs(spectra) ** 2, smoothing, axis = -1, mode = 'wrap')
+        spectra = spectra / np.sqrt(np.maximum(power, np.finfo(power.dtype).tiny))
+
+    cross = spectra[pairs[:, 0]] * spectra[pairs[:, 1]].conj()
+    if weighting == 'phat':
+        cross /= np.maximum(np.abs(cross), np.finfo(cross.real.dtype).tiny)
+    correlation = np.abs(ifft(cross, axis = -1, overwrite_x = True))
+
+    time_shift = np.zeros(len(pairs))
+    peak_mags = np.zeros(len(pairs))
+    for p, max_shift in enumerate(pair_time_shifts):
+        # time shift t sits in column (-t) % n_fft
+        time_shifts = np.arange(-max_shift, max_shift + 1)
+        window = correlation[p, (-time_shifts) % n_fft]
+        ind = np.argmax(window)
+        peak_mags[p] = window[ind]
+
+        # the parabola is fit from the full correlation, so a peak on the
+        # edge of the window still has both neighbours
+        neighbours = correlation[p, (-(time_shifts[ind] + np.array([-1, 0, 1]))) % n_fft]
+        time_shift[p] = time_shifts[ind] + _parabolic_offset(*neighbours)
+
+    return pairs, time_shift, peak_mags
+
+def separable_caf(sig1, sig2, max_time_shift, refine_lags = 1, dtype = None, max_freq_shift = None):
+    """
+    Two stage CAF peak search for strong signals. The lag is found first
+    from the cross-correlation, then the frequency shift from one FFT of the
+    lag aligned product, optionally repeated for a few neighbouring lags in
+    case the frequency offset pulled the correlation peak. This costs
+    2 * refine_lags + 4 FFTs instead of one per lag.
+
+    params:
+        sig1: First signal
+        sig2: Second signal
+        max_time_shift: Largest time shift (in samples) to search
+        refine_lags: Number of lags on each side of the correlation peak to
+            also search for the frequency shift
+        dtype: Complex dtype to compute in, complex64 inputs stay in single
+            precision when not given
+        max_freq_shift: Largest frequency shift (cycles / sample) to search,
+            every FFT bin when not given
+    returns:
+        Time shift (samples), frequency shift (cycles / sample) and peak
+        magnitude, with the same conventions as fft_caf
+    """
+    assert len(sig1) == len(sig2), "Signals must be the same length."
+    sig1, sig2 = _working_precision(sig1, sig2, dtype)
+
+    K = len(sig1)
+    time_shifts = np.arange(-max_time_shift, max_time_shift + 1)
+
+    # circular cross-correlation, time shift t sits in column (-t) % K
+    correlation = np.abs(ifft(fft(sig1) * fft(sig2).conj()))[(-time_shifts) % K]
+    lag = time_shifts[np.argmax(correlation)]
+
+    candidates = np.arange(max(lag - refine_lags, -max_time_shift), min(lag + refine_lags, max_time_shift) + 1)
+    caf_mag = np.abs(fft(_lag_products(sig1, sig2, candidates), axis = -1, overwrite_x = True))
+    if max_freq_shift is not None:
+        caf_mag[:, ~_freq_window(K, max_freq_shift)] = 0
+
+    max_ind = np.unravel_index(np.argmax(caf_mag), caf_mag.shape)
+    time_shift = candidates[max_ind[0]]
+    freq_shift = (((max_ind[1] + (K // 2)) % K) - (K // 2)) / K
+
+    return time_shift, freq_shift, caf_mag[max_ind]
+
+def coarse_to_fine_caf(sig1, sig2, max_time_shift, decimation = 4, num_candidates = 2, zoom = 16, dtype = None, max_freq_shift = None):
+    """
+    Two stage CAF search. A CAF of block-averaged (decimated) signals finds
+    candidate peaks, then each candidate is refined at full rate over the
+    neighbouring time shifts with a zoom FFT around its frequency bin.
+
+    params:
+        sig1: First signal
+        sig2: Second signal
+        max_time_shift: Largest time shift (in samples) to search
+        decimation: Block-averaging factor of the coarse stage
+        num_candidates: Number of coarse peaks to refine
+        zoom: Refined frequency points per coarse frequency bin
+        dtype: Complex dtype to compute in, complex64 inputs stay in single
+            precision when not given
+        max_freq_shift: Largest frequency shift (cycles / sample) to search,
+            all frequencies when not given
+    returns:
+        Time shift (samples), frequency shift (cycles / sample) and peak magnitude
+    """
+    assert len(sig1) == len(sig2), "Signals must be the same length."
+    sig1, sig2 = _working_precision(sig1, sig2, dtype)
+
+    K = len(sig1)
+    D = decimation
+    Kd = K // D
+
+    # block averaging is a cheap low pass filter, which is all the coarse
+    # stage needs as Doppler shifts are a tiny fraction of the sample rate
+    dec1 = sig1[:Kd * D].reshape(Kd, D).mean(axis = 1)
+    dec2 = sig2[:Kd * D].reshape(Kd, D).mean(axis = 1)
+    coarse_shifts = np.arange(-int(np.ceil(max_time_shift / D)), int(np.ceil(max_time_shift / D)) + 1)
+    # zero padding only refines the coarse frequency grid
+    Kc = next_fast_len(Kd)
+    coarse_mag = np.abs(fft(_lag_products(dec1, dec2, coarse_shifts), n = Kc, axis = -1, overwrite_x = True))
+
+    num_coarse_freqs = Kc
+    if max_freq_shift is not None:
+        # a decimated sample spans D full rate samples
+        freq_window = _freq_window(Kc, max_freq_shift * D)
+        coarse_mag *= freq_window
+        num_coarse_freqs = np.count_nonzero(freq_window)
+
+    num_candidates = min(num_candidates, len(coarse_shifts) * num_coarse_freqs)
+    candidates = np.argpartition(coarse_mag.ravel(), -num_candidates)[-num_candidates:]
+
+    # one coarse frequency bin in cycles per full rate sample
+    bin_width = 1 / (Kc * D)
+    time_shift, freq_shift, max_mag = 0, 0.0, -1.0
+
+    for candidate in candidates:
+        lag_ind, freq_ind = np.unravel_index(candidate, coarse_mag.shape)
+        center_freq = (((freq_ind + (Kc // 2)) % Kc) - (Kc // 2)) * bin_width
+        fine_shifts = np.arange(max(coarse_shifts[lag_ind] * D - D, -max_time_shift),
+                                min(coarse_shifts[lag_ind] * D + D, max_time_shift) + 1)
+        low, high = center_freq - bin_width, center_freq + bin_width
+        if max_freq_shift is not None:
+            low, high = max(low, -max_freq_shift), min(high, max_freq_shift)
+        freqs = np.linspace(low, high, 2 * zoom + 1)
+
+        fine_mag = np.abs(zoom_fft(_lag_products(sig1, sig2, fine_shifts),
+                                   [freqs[0], freqs[-1]], m = len(freqs), fs = 1, endpoint = True, axis = -1))
+        fine_ind = np.unravel_index(np.argmax(fine_mag), fine_mag.shape)
+
+        if fine_mag[fine_ind] > max_mag:
+            max_mag = fine_mag[fine_ind]
+            time_shift = fine_shifts[fine_ind[0]]
+            freq_shift = freqs[fine_ind[1]]
+
+    return time_shift, freq_shift, max_mag
+
+def streaming_caf(blocks1, blocks2, max_time_shift, segment_length = 4096, coherent = False, dtype = np.complex128):
+    """
+    CAF of two arbitrarily long captures given as iterators of IQ blocks.
+    Both streams are cut into segments that are correlated one at a time
+    (with max_time_shift samples of the neighbouring segments so shifts
+    reach across segment boundaries) and integrated into a fixed size surface,
+    so memory does not grow with the capture length.
+
+    params:
+        blocks1: Iterable of 1D IQ arrays of the first capture
+        blocks2: Iterable of 1D IQ arrays of the second capture
+        max_time_shift: Largest time shift (in samples) to search, at most segment_length
+        segment_length: Samples per segment, which sets the frequency resolution
+        coherent: Sum complex segment CAFs instead of their powers
+        dtype: Complex dtype the blocks are converted to and correlated in
+    returns:
+        Same as fft_caf, with a surface of shape (segment_length, 2 * max_time_shift + 1)
+    """
+    assert max_time_shift <= segment_length, "Time shifts can not reach past the neighbouring segments."
+
+    B = segment_length
+    M = max_time_shift
+    time_shifts = np.arange(-M, M + 1)
+
+    dtype = np.dtype(dtype)
+    segments1 = _segments(blocks1, B, dtype)
+    segments2 = _segments(blocks2, B, dtype)
+
+    caf_out = np.zeros((B, len(time_shifts)), dtype = dtype if coherent else np.finfo(dtype).dtype)
+    prev2 = np.zeros(M, dtype = dtype)
+    cur2 = next(segments2, None)
+
+    for seg1 in segments1:
+        if cur2 is None:
+            cur2 = np.zeros(B, dtype = dtype)
+        next2 = next(segments2, None)
+        lookahead = next2[:M] if next2 is not None else np.zeros(M, dtype = dtype)
+
+        # row i holds sig2 shifted by time_shifts[i] against this segment of sig1
+        window = np.concatenate((prev2, cur2, lookahead))
+        sig2_shifted = sliding_window_view(window, B)[M + time_shifts]
+        caf = fft(seg1 * sig2_shifted.conj(), axis = -1).T
+
+        # segments start on multiples of B, so at the segment bin frequencies
+        # the phase that aligns each segment with the full capture is exactly 1
+        # and coherent integration is a plain sum
+        if coherent:
+            caf_out += caf
+        else:
+            caf_out += np.abs(caf)**2
+
+        prev2 = cur2[B - M:]
+        cur2 = next2
+
+    if not coherent:
+        caf_out = np.sqrt(caf_out)
+
+    max_ind = np.unravel_index(np.argmax(np.abs(caf_out)), caf_out.shape)
+
+    time_shift = time_shifts[max_ind[1]]
+    freq_shift = (((max_ind[0] + (B // 2)) % B) - (B // 2)) / B
+
+    max_mag = np.max(np.abs(caf_out))
+    median_mag = np.median(np.abs(caf_out))
+
+    return caf_out, time_shift, freq_shift, max_mag, median_mag
+
+def multi_burst_caf(bursts1, bursts2, time_tags, max_time_shift, max_freq_shift, num_freqs = None, coherent = True, dtype = None):
+    """
+    Combines the CAF surfaces of several short bursts into one, e.g. the
+    windows around successive squitters of the same aircraft. Every burst is
+    evaluated on one shared frequency grid so the surfaces line up.
+
+    Coherently, burst b is rotated by exp(-2j pi f tag_b) so its phase matches
+    a CAF over the whole timeline, and the frequency resolution becomes
+    1 / (span of the tags) rather than 1 / (burst length). This needs the
+    carrier phase to be continuous between bursts, as in windows cut from
+    one capture. Non-coherently the squared magnitudes are summed instead.
+
+    params:
+        bursts1: Sequence of burst windows of the first receiver
+        bursts2: Matching burst windows of the second receiver, each the same
+            length as its counterpart in bursts1
+        time_tags: Start sample of every window on the common timeline
+        max_time_shift: Largest time shift (in samples) to search
+        max_freq_shift: Largest frequency shift (cycles / sample) to search
+        num_freqs: Points of the frequency grid over +-max_freq_shift, by
+            default four per coherent resolution cell of the tag span
+        coherent: Sum with phase compensation if True, else sum squared magnitudes
+        dtype: Complex dtype to compute in, complex64 inputs stay in single
+            precision when not given
+    returns:
+        CAF surface of shape (num_freqs, 2 * max_time_shift + 1), time shift
+        (samples), frequency shift (cycles / sample), max magnitude and median magnitude
+    """
+    assert len(bursts1) == len(bursts2) == len(time_tags), "Need one time tag per pair of bursts."
+    time_tags = np.asarray(time_tags)
+
+    time_shifts = np.arange(-max_time_shift, max_time_shift + 1)
+    if num_freqs is None:
+        span = time_tags.max() + len(bursts1[np.argmax(time_tags)]) - time_tags.min()
+        num_freqs = 2 * int(np.ceil(4 * max_freq_shift * span)) + 1
+    freqs = np.linspace(-max_freq_shift, max_freq_shift, num_freqs)
+
+    caf_out = np.zeros((num_freqs, len(time_shifts)), dtype = np.complex128 if coherent else float)
+
+    for burst1, burst2, tag in zip(bursts1, bursts2, time_tags):
+        assert len(burst1) == len(burst2), "Burst windows must be the same length."
+        burst1, burst2 = _working_precision(burst1, burst2, dtype)
+        caf = zoom_fft(_lag_products(burst1, burst2, time_shifts),
+                       [freqs[0], freqs[-1]], m = num_freqs, fs = 1, endpoint = True, axis = -1).T
+
+        if coherent:
+            # the burst's own sample 0 is sample tag of the common timeline
+            caf_out += caf * np.exp(-2j * np.pi * freqs * tag)[:, None]
+        else:
+            caf_out += np.abs(caf)**2
+
+    if not coherent:
+        caf_out = np.sqrt(caf_out)
+
+    caf_mag = np.abs(caf_out)
+    max_ind = np.unravel_index(np.argmax(caf_mag), caf_mag.shape)
+
+    time_shift = time_shifts[max_ind[1]]
+    freq_shift = freqs[max_ind[0]]
+
+    max_mag = caf_mag[max_ind]
+    median_mag = np.median(caf_mag)
+
+    return caf_out, time_shift, freq_shift, max_mag, median_mag
+
+def refine_caf_peak(sig1, sig2, time_shift, freq_shift, method = 'parabolic'):
+    """
+    Refines an integer time shift and FFT bin frequency shift from any of
+    the CAF functions to fractional values. Only the cells around the peak
+    are evaluated, so this is cheap compared to oversampling or longer FFTs.
+
+    params:
+        sig1: First signal
+        sig2: Second signal
+        time_shift: Peak time shift (samples)
+        freq_shift: Peak frequency shift (cycles / sample)
+        method: 'parabolic' fits parabolas through the 3x3 neighbourhood of the
+            peak magnitude, 'phase' uses the phase slope of the cross spectrum
+            for time and the phase rotation of the aligned product for frequency
+    returns:
+        Fractional time shift (samples) and frequency shift (cycles / sample)
+    """
+    assert len(sig1) == len(sig2), "Signals must be the same length."
+    sig1, sig2 = _working_precision(sig1, sig2, None)
+
+    K = len(sig1)
+    n = np.arange(K)
+    time_shift = int(time_shift)
+
+    if method == 'parabolic':
+        products = _lag_products(sig1, sig2, np.arange(time_shift - 1, time_shift + 2))
+        freqs = freq_shift + np.array([-1, 0, 1]) / K
+        neighbourhood = np.abs(products @ np.exp(-2j * np.pi * np.outer(freqs, n)).T)
+        time_offset = _parabolic_offset(*neighbourhood[:, 1])
+        freq_offset = _parabolic_offset(*neighbourhood[1, :]) / K
+    elif method == 'phase':
+        # the residual frequency rotates the phase of the aligned product,
+        # so compare the phase of its two halves
+        product = sig1 * np.roll(sig2, -time_shift).conj() * np.exp(-2j * np.pi * freq_shift * n)
+        half = K // 2
+        freq_offset = np.angle(np.sum(product[half:2 * half]) * np.sum(product[:half]).conj()) / (2 * np.pi * half)
+
+        # a fractional delay d is a phase ramp of 2 pi k d / K across the
+        # cross spectrum. Comparing bins K / 8 apart instead of neighbours
+        # keeps the estimate well conditioned and is unambiguous for |d| < 4
+        freq_sig1 = fft(sig1 * np.exp(-2j * np.pi * (freq_shift + freq_offset) * n))
+        freq_sig2 = fft(np.roll(sig2, -time_shift))
+        cross = freq_sig1 * freq_sig2.conj()
+        step = max(1, K // 8)
+        time_offset = np.angle(np.sum(cross[step:] * cross[:-step].conj())) * K / (2 * np.pi * step)
+    else:
+        raise ValueError(f"Unknown peak interpolation method: {method}")
+
+    return time_shift + time_offset, freq_shift + freq_offset
+
+def iter_blocks(signal, block_size = 4096):
+    """
+    Splits an in-memory signal into blocks for the streaming CAF.
+    """
+    for start in range(0, len(signal), block_size):
+        yield signal[start:start + block_size]
+
+def read_iq_blocks(path, block_size = 4096):
+    """
+    Reads a bladeRF recording written by sample_recv (comma separated "I Q"
+    pairs of SC16 Q11 samples) as blocks of complex samples without loading
+    the whole file.
+
+    params:
+        path: Path of the recording
+        block_size: Approximate number of samples per block
+    returns:
+        Generator of 1D complex arrays scaled to [-1, 1)
+    """
+    with open(path) as f:
+        tail = ''
+        while True:
+            # each "I Q," pair is at most 12 characters
+            text = f.read(12 * block_size)
+            if not text:
+                break
+            pairs = (tail + text).split(',')
+            tail = pairs.pop()
+            if pairs:
+                yield _parse_iq_pairs(pairs)
+        if tail.strip():
+            yield _parse_iq_pairs([tail])
+
+def write_iq_blocks(path, blocks):
+    """
+    Writes blocks of complex samples in the sample_recv recording format
+    read by read_iq_blocks, one block at a time. Samples are quantized to
+    SC16 Q11 and clipped to [-1, 1).
+
+    params:
+        path: Path of the recording
+        blocks: Iterable of 1D complex arrays
+    returns:
+        Number of samples written
+    """
+    written = 0
+    with open(path, 'w') as f:
+        for block in blocks:
+            block = np.asarray(block)
+            iq = np.clip(np.rint(np.stack((block.real, block.imag), axis = -1) * 2048), -2048, 2047).astype(int)
+            f.write(''.join(f"{i} {q}," for i, q in iq))
+            written += len(block)
+    return written
+
+def _parse_iq_pairs(pairs):
+    iq = np.array([pair.split() for pair in pairs if pair.strip()], dtype = np.float64)
+    return (iq[:, 0] + 1j * iq[:, 1]) / 2048
+
+def _segments(blocks, segment_length, dtype):
+    # regroups blocks of any size into fixed length segments, zero padding the last one
+    buffer = []
+    buffered = 0
+    for block in blocks:
+        buffer.append(np.asarray(block, dtype = dtype))
+        buffered += len(block)
+        while buffered >= segment_length:
+            joined = np.concatenate(buffer)
+            yield joined[:segment_length]
+            buffer = [joined[segment_length:]]
+            buffered -= segment_length
+    if buffered > 0:
+        yield np.concatenate(buffer + [np.zeros(segment_length - buffered, dtype = dtype)])
+
+def _working_precision(sig1, sig2, dtype):
+    # without an explicit dtype, single precision inputs stay single precision
+    sig1, sig2 = np.asarray(sig1), np.asarray(sig2)
+    dtype = dtype or np.result_type(sig1, sig2, np.complex64)
+    return sig1.astype(dtype, copy = False), sig2.astype(dtype, copy = False)
+
+def _freq_window(n_fft, max_freq_shift):
+    # FFT bins whose signed frequency lies within +-max_freq_shift cycles / sample
+    freqs = (((np.arange(n_fft) + (n_fft // 2)) % n_fft) - (n_fft // 2)) / n_fft
+    return np.abs(freqs) <= max_freq_shift
+
+def _parabolic_offset(left, center, right):
+    # vertex of the parabola through three equally spaced points, relative to the center
+    denom = left - 2 * center + right
+    if denom == 0:
+        return 0.0
+    return float(np.clip(.5 * (left - right) / denom, -.5, .5))
+
+def _lag_chunk(row_length):
+    return max(1, CHUNK_ELEMENTS // row_length)
+
+def _lag_products(sig1, sig2, time_shifts, out = None):
+    """
+    Builds the lag-product matrix sig1 * np.roll(sig2, -tshift).conj() for a
+    contiguous run of time shifts without making a rolled copy per shift.
+
+    params:
+        sig1: Reference signal, shape (K,)
+        sig2: Signal or stack of signals to shift, shape (..., K)
+        time_shifts: Increasing, consecutive time shifts (in samples)
+        out: Optional buffer to write the products into
+    returns:
+        Products of shape (..., len(time_shifts), K)
+    """
+    K = sig2.shape[-1]
+    # every rolled copy of sig2 is a length K window into one circularly
+    # extended array, so the windows can be strided views instead of copies
+    ext_inds = np.arange(time_shifts[0], time_shifts[-1] + K) % K
+    sig2_ext = sig2.conj()[..., ext_inds]
+    return np.multiply(sig1, sliding_window_view(sig2_ext, K, axis = -1), out = out)
@@ -0,0 +1,132 @@
+import numpy as np
+from scipy.signal import find_peaks, oaconvolve
+
+from .caf import batched_fft_caf
+
+PREAMBLE = '101000010100000' # same preamble Emitter.generate_signal prepends
+
+def preamble_template(samples_per_bit: int,
+                      preamble: str = PREAMBLE,
+                      modulation: str = 'bpsk') -> np.ndarray:
+    """
+    Sampled preamble waveform, modulated like Emitter.generate_signal and
+    Receiver.sample_signal do.
+
+    params:
+        samples_per_bit: Samples per bit at the receiver
+        preamble: Preamble bits
+        modulation: 'bpsk' or pulse position modulation 'ppm', as the Receiver
+    returns:
+        Template of length len(preamble) * samples_per_bit
+    """
+    if modulation not in ('bpsk', 'ppm'):
+        raise ValueError(f"Unknown modulation: {modulation}")
+
+    ones = np.array([bit == '1' for bit in preamble])
+    if modulation == 'ppm':
+        # a 1 is a pulse in the first half of the bit, a 0 in the second half
+        first_half = np.arange(samples_per_bit) < int(samples_per_bit / 2)
+        return np.where(ones[:, None], first_half, ~first_half).astype(float).ravel()
+    return np.repeat(np.where(ones, 1., -1.), samples_per_bit)
+
+def matched_filter(signal: np.ndarray,
+                   template: np.ndarray) -> np.ndarray:
+    """
+    Normalized matched filter of a capture against a real template, computed
+    with overlap-add FFT convolution so long captures stay cheap. The
+    magnitude is taken so the unknown carrier phase doesn't matter.
+
+    params:
+        signal: Complex capture
+        template: Real template waveform
+    returns:
+        Score in [0, 1] for every start sample where the template fits entirely,
+        i.e. len(signal) - len(template) + 1 values
+    """
+    T = len(template)
+    correlation = np.abs(oaconvolve(signal, template[::-1], mode='valid'))
+
+    # energy of every length T window from a running sum
+    energy = np.concatenate(([0], np.cumsum(np.abs(signal) ** 2)))
+    window_energy = np.maximum(energy[T:] - energy[:-T], 0)
+
+    # silent windows have no energy but still some FFT round-off, so floor
+    # the norm relative to the loudest window
+    norm = np.sqrt(window_energy) * np.linalg.norm(template)
+    return correlation / np.maximum(norm, np.sqrt(np.finfo(float).eps) * np.max(norm))
+
+def detect_bursts(signal: np.ndarray,
+                  samples_per_bit: int,
+                  threshold: float = .8,
+                  min_separation: int = None,
+                  preamble: str = PREAMBLE,
+                  modulation: str = 'bpsk') -> np.ndarray:
+    """
+    Finds the start samples of messages in a capture from their preamble.
+
+    params:
+        signal: Complex capture of one receiver
+        samples_per_bit: Samples per bit at the receiver
+        threshold: Minimum normalized matched filter score of a detection
+        min_separation: Minimum distance (in samples) between detections, the
+            preamble length when not given. Setting it to the message length
+            stops parts of the payload that look like a preamble from
+            triggering inside a burst.
+        preamble: Preamble bits
+        modulation: Modulation of the capture, 'bpsk' or 'ppm'
+    returns:
+        Start samples of the detected bursts, in increasing order
+    """
+    template = preamble_template(samples_per_bit, preamble, modulation)
+    scores = matched_filter(signal, template)
+    starts, _ = find_peaks(scores, height=threshold, distance=min_separation or len(template))
+    return starts
+
+def gated_caf(ref_sig: np.ndarray,
+              sigs: np.ndarray,
+              max_time_shift,
+              samples_per_bit: int,
+              burst_length: int,
+              threshold: float = .8,
+              max_freq_shift=None,
+              preamble: str = PREAMBLE,
+              modulation: str = 'bpsk'):
+    """
+    CAF peaks of every burst detected in the reference capture, computed only
+    on a window around each burst instead of the whole capture, so the cost
+    scales with the number of messages rather than the capture length.
+
+    params:
+        ref_sig: Reference capture, shape (K,)
+        sigs: Stacked captures of the other receivers, shape (N, K)
+        max_time_shift: Largest time shift (in samples) to search, either one
+            value or one per receiver
+        samples_per_bit: Samples per bit at the receivers
+        burst_length: Length of a message including the preamble (samples)
+        threshold: Minimum normalized matched filter score of a detection
+        max_freq_shift: Largest frequency shift (cycles / sample) to search,
+            either one value or one per receiver
+        preamble: Preamble bits
+        modulation: Modulation of the captures, 'bpsk' or 'ppm'
+    returns:
+        Burst start samples (B,) in the reference capture, and time shifts
+        (samples), frequency shifts (cycles / sample) and peak magnitudes of
+        shape (B, N), with the same conventions as batched_fft_caf
+    """
+    sigs = np.atleast_2d(sigs)
+    K = len(ref_sig)
+    starts = detect_bursts(ref_sig, samples_per_bit, threshold, burst_length, preamble, modulation)
+
+    # the window reaches max_time_shift past both ends of the burst so the
+    # shifted copy in every other capture is inside it
+    margin = int(np.max(max_time_shift))
+    time_shifts = np.zeros((len(starts), len(sigs)))
+    freq_shifts = np.zeros((len(starts), len(sigs)))
+    max_mags = np.zeros((len(starts), len(sigs)))
+
+    for b, start in enumerate(starts):
+        window = slice(max(start - margin, 0), min(start + burst_length + margin, K))
+        time_shifts[b], freq_shifts[b], max_mags[b], _ = batched_fft_caf(ref_sig[window], sigs[:, window], max_time_shift,
+                                                                         fast_len=True, max_freq_shift=max_freq_shift)
+
+    return starts, time_shifts, freq_shifts, max_mags
@@ -0,0 +1,125 @@
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    import scipy.fft as scipy_fft
+except ImportError:
+    scipy_fft = None
+
+# scipy.fft keeps complex64 in single precision and can split batched
+# transforms across threads, numpy.fft is the fallback when scipy is missing
+backend = 'scipy' if scipy_fft is not None else 'numpy'
+# scipy worker threads, None leaves it to scipy so simulations spread over
+# processes don't each claim every core
+workers = None
+
+# scratch buffers are per thread so concurrent simulations never share one,
+# and together stay under one CHUNK_ELEMENTS chunk of complex128
+_scratch = threading.local()
+MAX_SCRATCH_BYTES = 1 << 26
+
+def set_backend(name: str, num_workers: int = None):
+    """
+    Selects the library every FFT in doa_utils runs through.
+
+    params:
+        name: 'scipy' or 'numpy'
+        num_workers: Worker threads for scipy.fft, -1 for all cores. None
+            uses scipy's default, one unless set with scipy.fft.set_workers
+    """
+    global backend, workers
+    if name not in ('scipy', 'numpy'):
+        raise ValueError(f"Unknown FFT backend: {name}")
+    if name == 'scipy' and scipy_fft is None:
+        raise ValueError("scipy is not installed")
+    backend = name
+    workers = num_workers
+
+def fft(x: np.ndarray, n: int = None, axis: int = -1, overwrite_x: bool = False) -> np.ndarray:
+    """
+    Forward FFT along one axis, zero padded to n samples if given. The
+    output keeps the precision of the input.
+    """
+    if backend == 'scipy':
+        return scipy_fft.fft(x, n=n, axis=axis, overwrite_x=overwrite_x, workers=workers)
+    return np.fft.fft(x, n=n, axis=axis).astype(_complex_dtype(x), copy=False)
+
+def ifft(x: np.ndarray, n: int = None, axis: int = -1, overwrite_x: bool = False) -> np.ndarray:
+    """
+    Inverse FFT along one axis, zero padded to n samples if given. The
+    output keeps the precision of the input.
+    """
+    if backend == 'scipy':
+        return scipy_fft.ifft(x, n=n, axis=axis, overwrite_x=overwrite_x, workers=workers)
+    return np.fft.ifft(x, n=n, axis=axis).astype(_complex_dtype(x), copy=False)
+
+def rfft(x: np.ndarray, n: int = None, axis: int = -1) -> np.ndarray:
+    """
+    FFT of a real signal along one axis, only the non-negative frequencies.
+    The output keeps the precision of the input.
+    """
+    if backend == 'scipy':
+        return scipy_fft.rfft(x, n=n, axis=axis, workers=workers)
+    return np.fft.rfft(x, n=n, axis=axis).astype(_complex_dtype(x), copy=False)
+
+def irfft(x: np.ndarray, n: int = None, axis: int = -1, overwrite_x: bool = False) -> np.ndarray:
+    """
+    Inverse of rfft, n is the length of the real output. The output keeps
+    the precision of the input.
+    """
+    if backend == 'scipy':
+        return scipy_fft.irfft(x, n=n, axis=axis, overwrite_x=overwrite_x, workers=workers)
+    return np.fft.irfft(x, n=n, axis=axis).astype(np.finfo(_complex_dtype(x)).dtype, copy=False)
+
+@lru_cache(maxsize=None)
+def next_fast_len(n: int) -> int:
+    """
+    Smallest length >= n that the backend transforms efficiently. Only use
+    it where zero padding doesn't change the result, e.g. linear correlation
+    or interpolating a spectrum onto a finer frequency grid.
+    """
+    if scipy_fft is not None:
+        return scipy_fft.next_fast_len(n)
+    # 5-smooth lengths are fast for numpy's pocketfft as well
+    length = n
+    while True:
+        remainder = length
+        for p in (2, 3, 5):
+            while remainder % p == 0:
+                remainder //= p
+        if remainder == 1:
+            return length
+        length += 1
+
+def scratch(shape: tuple, dtype: type) -> np.ndarray:
+    """
+    Reusable uninitialized buffer for intermediate products, cached per
+    thread. Every dtype has one flat buffer, grown to the largest size asked
+    for and reshaped to each request, so the shorter last chunk of a loop
+    reuses the memory of the full ones. The cached buffers together stay
+    under MAX_SCRATCH_BYTES, larger requests get a fresh array. The caller
+    must be done with a buffer before asking for another one of the same
+    dtype.
+    """
+    dtype = np.dtype(dtype)
+    size = int(np.prod(shape))
+    if size * dtype.itemsize > MAX_SCRATCH_BYTES:
+        return np.empty(shape, dtype=dtype)
+
+    buffers = getattr(_scratch, 'buffers', None)
+    if buffers is None:
+        buffers = _scratch.buffers = {}
+
+    buffer = buffers.get(dtype)
+    if buffer is None or buffer.size < size:
+        buffers.pop(dtype, None)
+        # make room by dropping the buffers of other dtypes, oldest first
+        while buffers and sum(b.nbytes for b in buffers.values()) + size * dtype.itemsize > MAX_SCRATCH_BYTES:
+            buffers.pop(next(iter(buffers)))
+        buffer = buffers[dtype] = np.empty(size, dtype=dtype)
+    return buffer[:size].reshape(shape)
+
+def _complex_dtype(x):
+    return np.result_type(x, np.complex64)
@@ -0,0 +1,134 @@
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+
+from .rng import Seed, as_generator, integers
+
+# Mode S parity generator polynomial 0x1FFF409 without its leading term
+CRC_POLY = 0xFFF409
+
+DF17_BITS = 112
+DF17_DATA_BITS = 88
+
+PREAMBLE_BITS = np.array([1, 0, 1, 0, 0, 0, 0, 1, 0, 1, 0, 0, 0, 0, 0], dtype=np.uint8) # Emitter.preamble
+
+def random_bits(num_bits: int,
+                num_messages: Optional[int] = None,
+                rng: Seed = None) -> np.ndarray:
+    """
+    Random message bits.
+
+    params:
+        num_bits: Bits per message
+        num_messages: Number of messages, a single 1D message when not given
+        rng: Generator or seed, see doa_utils.rng.as_generator
+    returns:
+        uint8 array of 0s and 1s, shape (num_bits,) or (num_messages, num_bits)
+    """
+    shape = num_bits if num_messages is None else (num_messages, num_bits)
+    return integers(as_generator(rng), 0, 2, shape, dtype=np.uint8)
+
+def crc24(bits: np.ndarray) -> np.ndarray:
+    """
+    Mode S CRC of messages given as bits, computed a byte at a time with a
+    lookup table across the whole batch.
+
+    params:
+        bits: uint8 array of shape (..., n) with n a multiple of 8
+    returns:
+        uint8 array of the 24 parity bits, shape (..., 24)
+    """
+    data = np.packbits(bits, axis=-1).astype(np.uint32)
+    table = _crc_table()
+    crc = np.zeros(data.shape[:-1], dtype=np.uint32)
+    for i in range(data.shape[-1]):
+        crc = ((crc << 8) & 0xFFFFFF) ^ table[(crc >> 16) ^ data[..., i]]
+    return _to_bits(crc, 24)
+
+def df17_frames(num_messages: Optional[int] = None,
+                icao: Optional[np.ndarray] = None,
+                me: Optional[np.ndarray] = None,
+                rng: Seed = None) -> np.ndarray:
+    """
+    112 bit DF17 extended squitter frames with a valid CRC.
+
+    params:
+        num_messages: Number of frames, a single 1D frame when not given
+        icao: 24 bit aircraft addresses as integers, one or one per frame,
+            random when not given
+        me: 56 bit message fields as bits, shape (56,) or (num_messages, 56).
+            Random airborne positions (type code 11) when not given.
+        rng: Generator or seed, see doa_utils.rng.as_generator
+    returns:
+        uint8 array of shape (112,) or (num_messages, 112)
+    """
+    batch = 1 if num_messages is None else num_messages
+    rng = as_generator(rng)
+    if icao is None:
+        icao = integers(rng, 0, 1 << 24, batch)
+    if me is None:
+        me = random_bits(56, batch, rng)
+        me[:, :5] = _to_bits(np.array(11), 5) # type code 11, airborne position with barometric altitude
+        me[:, 5:8] = 0 # surveillance status and single antenna flag
+        me[:, 15] = 1 # Q bit, altitude in 25 ft steps
+        me[:, 20] = 0 # UTC time flag
+
+    frames = np.zeros((batch, DF17_BITS), dtype=np.uint8)
+    frames[:, :5] = _to_bits(np.array(17), 5) # downlink format
+    frames[:, 5:8] = _to_bits(np.array(5), 3) # capability, airborne
+    frames[:, 8:32] = _to_bits(np.broadcast_to(np.asarray(icao, dtype=np.uint32), (batch,)), 24)
+    frames[:, 32:88] = me
+    frames[:, 88:] = crc24(frames[:, :DF17_DATA_BITS])
+
+    return frames[0] if num_messages is None else frames
+
+def bits_to_symbols(bits: np.ndarray,
+                    preamble: np.ndarray = PREAMBLE_BITS,
+                    levels: tuple = (-1, 1)) -> np.ndarray:
+    """
+    Symbols of messages with the preamble prepended, mapped with one table
+    lookup instead of bit by bit.
+
+    params:
+        bits: uint8 array of shape (..., n)
+        preamble: Preamble bits prepended to every message
+        levels: Symbols of a 0 and a 1 bit
+    returns:
+        int8 array of shape (..., len(preamble) + n)
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    preamble = np.broadcast_to(np.asarray(preamble, dtype=np.uint8), bits.shape[:-1] + (len(preamble),))
+    return np.asarray(levels, dtype=np.int8)[np.concatenate((preamble, bits), axis=-1)]
+
+def frames_to_hex(frames: np.ndarray) -> List[str]:
+    """
+    Hex strings of frames, as recv_hex.py receives them and pyModeS decodes them.
+    """
+    frames = np.atleast_2d(frames)
+    return [row.tobytes().hex().upper() for row in np.packbits(frames, axis=-1)]
+
+def hex_to_frames(messages: List[str]) -> np.ndarray:
+    """
+    Bits of hex messages, e.g. captured frames to simulate again.
+
+    returns:
+        uint8 array of shape (len(messages), 4 * hex digits)
+    """
+    data = np.array([list(bytes.fromhex(message)) for message in messages], dtype=np.uint8)
+    return np.unpackbits(data, axis=-1)
+
+@lru_cache(maxsize=None)
+def _crc_table():
+    table = np.zeros(256, dtype=np.uint32)
+    for byte in range(256):
+        crc = byte << 16
+        for _ in range(8):
+            crc = (crc << 1) ^ CRC_POLY if crc & 0x800000 else crc << 1
+        table[byte] = crc & 0xFFFFFF
+    return table
+
+def _to_bits(values, num_bits):
+    # most significant bit first, like the frame layout
+    shifts = np.arange(num_bits - 1, -1, -1, dtype=np.uint32)
+    return ((np.asarray(values, dtype=np.uint32)[..., None] >> shifts) & 1).astype(np.uint8)
@@ -0,0 +1,52 @@
+from typing import List, Union
+
+import numpy as np
+
+# anything the simulation entry points take as their rng argument
+Seed = Union[None, int, np.random.SeedSequence, np.random.Generator]
+
+def as_generator(rng: Seed = None):
+    """
+    Random source of a simulation entry point.
+
+    params:
+        rng: A Generator, used as is, or an int or SeedSequence to seed a new
+            one. None keeps numpy's global state, so np.random.seed still
+            reproduces runs that don't pass one.
+    returns:
+        np.random.Generator, or the np.random module for None
+    """
+    if rng is None or rng is np.random:
+        return np.random
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return np.random.default_rng(rng)
+
+def spawn(rng: Seed, num_streams: int) -> List:
+    """
+    Independent child streams, e.g. one per receiver or one per trial, from
+    a SeedSequence. The same seed always spawns the same streams, and no two
+    streams overlap, so they can be handed to parallel workers.
+
+    params:
+        rng: Parent Generator, int or SeedSequence. None gives num_streams
+            references to numpy's global state.
+        num_streams: Number of child streams
+    returns:
+        List of num_streams Generators
+    """
+    if rng is None or rng is np.random:
+        return [np.random] * num_streams
+    if isinstance(rng, np.random.Generator):
+        return rng.spawn(num_streams)
+    if not isinstance(rng, np.random.SeedSequence):
+        rng = np.random.SeedSequence(rng)
+    return [np.random.default_rng(child) for child in rng.spawn(num_streams)]
+
+def integers(rng, low: int, high: int, size=None, dtype: type = np.int64) -> np.ndarray:
+    """
+    Random integers in [low, high) from a Generator or the np.random module.
+    """
+    if isinstance(rng, np.random.Generator):
+        return rng.integers(low, high, size, dtype=dtype)
+    return rng.randint(low, high, size, dtype=dtype)
@@ -0,0 +1,193 @@
+from typing import List, Optional
+
+import numpy as np
+from scipy.signal import oaconvolve
+
+from .rng import Seed, spawn
+from .signal_generator import DELAY_TAPS, Emitter, ReceiverArray, fractional_delay_taps
+
+c = 299792458.0 # speed of light in m/s
+
+# messages rendered per batch, bounds the (messages, receivers, samples) intermediates
+MESSAGE_CHUNK = 64
+
+class TrafficScene:
+    """
+    Many emitters sending scheduled messages to the same receivers. Each
+    message is delayed, Doppler shifted and added at every receiver only over
+    the samples it covers, so a window of the capture costs as much as the
+    messages overlapping it rather than emitters times capture length.
+    """
+    def __init__(self,
+                 sample_rate: int, # samples / sec
+                 bit_duration: int, # sec / bit
+                 receiver_positions: List[np.ndarray],
+                 emitter_positions: np.ndarray, # (E, 3) cartesian position coords
+                 emitter_velocities: np.ndarray, # (E, 3) m / s
+                 frequency: float = 1090e6,
+                 noise_std: float = .03, # per component, about the Receiver noise level for unit amplitude messages
+                 dtype: type = np.complex128,
+                 modulation: str = 'bpsk',
+                 rng: Seed = None): # Generator or seed of the noise, numpy's global state when not given
+        self.receiver_array = ReceiverArray(sample_rate, bit_duration, receiver_positions, dtype=dtype, modulation=modulation)
+        self.sample_rate = sample_rate
+        self.samples_per_bit = int(sample_rate * bit_duration)
+        self.noise_std = noise_std
+        self.dtype = np.dtype(dtype)
+        # one noise stream per receiver like ReceiverArray.add_noise, None keeps numpy's global state
+        self.noise_streams = None if rng is None else spawn(rng, len(self.receiver_array))
+
+        self.emitters = [Emitter(frequency, np.asarray(pos, dtype=float), np.asarray(vel, dtype=float))
+                         for pos, vel in zip(emitter_positions, emitter_velocities)]
+        self.delays, self.dopplers = self.true_values()
+
+        self.message_emitters = np.zeros(0, dtype=int)
+        self.message_starts = np.zeros(0) # emission time in samples
+        self.message_symbols = []
+
+    def true_values(self):
+        """
+        returns:
+            Delay (sec) and Doppler shift (Hz) of every emitter at every
+            receiver, each of shape (E, N)
+        """
+        receiver_positions = self.receiver_array.positions
+        emitter_positions = np.array([emitter.position for emitter in self.emitters])
+        emitter_velocities = np.array([emitter.velocity for emitter in self.emitters])
+        frequencies = np.array([emitter.frequency for emitter in self.emitters])
+
+        offsets = receiver_positions[None, :, :] - emitter_positions[:, None, :]
+        distances = np.linalg.norm(offsets, axis=-1)
+        v = np.einsum('enk,ek->en', offsets, emitter_velocities) / distances # velocity towards each receiver
+        return distances / c, v / c * frequencies[:, None]
+
+    def schedule(self,
+                 emitter_indices: List[int],
+                 start_times: List[float],
+                 messages: List[str]):
+        """
+        Adds messages to the scene.
+
+        params:
+            emitter_indices: Emitter sending each message
+            start_times: Time (sec) each message leaves its emitter
+            messages: Bits of each message as strings or uint8 arrays, the
+                preamble is prepended
+        """
+        symbols = [np.asarray(self.emitters[e].generate_signal(bits), dtype=np.int8)
+                   for e, bits in zip(emitter_indices, messages)]
+        self.message_emitters = np.concatenate((self.message_emitters, np.asarray(emitter_indices, dtype=int)))
+        self.message_starts = np.concatenate((self.message_starts, np.asarray(start_times, dtype=float) * self.sample_rate))
+        self.message_symbols += symbols
+
+    def render(self,
+               start: int = 0,
+               num_samples: Optional[int] = None,
+               noise: bool = True) -> np.ndarray:
+        """
+        Renders samples [start, start + num_samples) of every receiver.
+
+        params:
+            start: First sample
+            num_samples: Number of samples, up to the end of the last message when not given
+            noise: Add receiver noise
+        returns:
+            Received signals of shape (N, num_samples)
+        """
+        first, last = self._arrival_spans()
+        if num_samples is None:
+            num_samples = int(np.max(last, initial=start)) - start
+
+        N = len(self.receiver_array)
+        real = np.zeros(N * num_samples)
+        imag = np.zeros(N * num_samples)
+
+        # in arrival order, so each chunk of messages covers a short stretch
+        overlapping = np.nonzero((last > start) & (first < start + num_samples))[0]
+        overlapping = overlapping[np.argsort(first[overlapping], kind='stable')]
+        lengths = np.array([len(self.message_symbols[m]) for m in overlapping], dtype=int)
+        for length in np.unique(lengths):
+            group = overlapping[lengths == length]
+            # a chunk ends once a message arrives a message length after its
+            # first one, so far apart emitters don't stretch the span a chunk touches
+            span = length * self.samples_per_bit
+            chunk_start = 0
+            for k in range(1, len(group) + 1):
+                if (k == len(group) or k - chunk_start == MESSAGE_CHUNK or
+                        first[group[k]] - first[group[chunk_start]] > span):
+                    self._accumulate(group[chunk_start:k], start, num_samples, real, imag)
+                    chunk_start = k
+
+        # accumulated sample-major, so nearby samples of all receivers are adjacent
+        signals = np.ascontiguousarray((real + 1j * imag).reshape(num_samples, N).T)
+        if noise:
+            if self.noise_streams is None:
+                signals += self.noise_std * (np.random.standard_normal((N, num_samples)) +
+                                             1j * np.random.standard_normal((N, num_samples)))
+            else:
+                # drawn sample by sample, so consecutive blocks continue each receiver's stream
+                for row, stream in zip(signals, self.noise_streams):
+                    draws = stream.standard_normal((num_samples, 2))
+                    row += self.noise_std * (draws[:, 0] + 1j * draws[:, 1])
+        return signals.astype(self.dtype, copy=False)
+
+    def render_blocks(self,
+                      num_samples: Optional[int] = None,
+                      block_size: int = 4096,
+                      noise: bool = True):
+        """
+        Renders the capture block by block, each block only touching the
+        messages that overlap it.
+
+        returns:
+            Generator of (N, block_size) blocks, the last may be shorter
+        """
+        if num_samples is None:
+            num_samples = int(np.max(self._arrival_spans()[1], initial=0))
+        for start in range(0, num_samples, block_size):
+            yield self.render(start, min(block_size, num_samples - start), noise)
+
+    def _arrival_spans(self):
+        # first and last sample any receiver gets of every message, with the filter spread
+        delays = self.delays[self.message_emitters] * self.sample_rate
+        lengths = np.array([len(symbols) for symbols in self.message_symbols], dtype=int) * self.samples_per_bit
+        first = self.message_starts + np.min(delays, axis=1, initial=np.inf) - DELAY_TAPS
+        last = self.message_starts + np.max(delays, axis=1, initial=-np.inf) + lengths + DELAY_TAPS
+        return first, last
+
+    def _accumulate(self, messages, start, num_samples, real, imag):
+        # all messages here have the same number of symbols
+        waveforms = self.receiver_array.receivers[0].sample_signal(np.array([self.message_symbols[m] for m in messages]))
+
+        # (messages, receivers) arrival times split like Receiver.add_time_delay
+        arrivals = self.message_starts[messages, None] + self.delays[self.message_emitters[messages]] * self.sample_rate
+        integer_delays = np.floor(arrivals).astype(int)
+        taps = fractional_delay_taps(arrivals - integer_delays)
+
+        # only filter the part of each message that reaches the window, with
+        # DELAY_TAPS - 1 samples in front so the filter output inside it is exact
+        center = (DELAY_TAPS - 1) // 2
+        length = waveforms.shape[-1]
+        offsets = np.maximum(start + center - (DELAY_TAPS - 1) - integer_delays.max(axis=1), 0)
+        crop = int(np.clip(np.max(start + num_samples + center - integer_delays.min(axis=1) - offsets), 0, length))
+        offsets = np.minimum(offsets, length - crop)
+        waveforms = waveforms[np.arange(len(messages))[:, None], offsets[:, None] + np.arange(crop)]
+        delayed = oaconvolve(waveforms[:, None, :], taps, mode='full', axes=-1)
+
+        # the 'same' mode filter center lands on the integer delay
+        indices = integer_delays[..., None] - center + offsets[:, None, None] + np.arange(delayed.shape[-1])
+        dopplers = self.dopplers[self.message_emitters[messages]]
+        # continuous carrier per emitter and receiver, computed in double precision
+        delayed = delayed * np.exp(2j * np.pi * dopplers[..., None] * indices / self.sample_rate)
+
+        inside = (indices >= start) & (indices < start + num_samples)
+        if not np.any(inside):
+            return
+        N = len(self.receiver_array)
+        rows = np.broadcast_to(np.arange(N)[None, :, None], indices.shape)
+        flat = ((indices - start) * N + rows)[inside]
+
+        # only the stretch these messages cover is touched
+        lo, hi = flat.min(), flat.max() + 1
+        real[lo:hi] += np.bincount(flat - lo, weights=delayed.real[inside], minlength=hi - lo)
+        imag[lo:hi] += np.bincount(flat - lo, weights=delayed.imag[inside], minlength=hi - lo)
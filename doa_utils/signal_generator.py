@@ -1,68 +1,305 @@
+from functools import lru_cache
 from typing import List
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter, oaconvolve
 
+from .fft_backend import irfft, next_fast_len, rfft
+from .messages import bits_to_symbols
+from .rng import Seed, as_generator, spawn
+
+# windowed sinc fractional delay filters, quantized to 1 / DELAY_RESOLUTION samples
+DELAY_TAPS = 100
+DELAY_RESOLUTION = 1024
+
+# bounds of the piecewise approximation of a moving emitter's channel
+MAX_PHASE_ERROR = 1e-3 # radians of carrier phase
+MAX_DELAY_ERROR = 1 / DELAY_RESOLUTION # samples of envelope delay
+
+# zero padding past the delayed signal, so the tails of the band limited
+# interpolation don't wrap around onto its start
+FFT_DELAY_GUARD = 1024
+
+def fft_fractional_delay(signals: np.ndarray,
+                         delay_samples) -> np.ndarray:
+    """
+    Delays real signals by any number of samples, integer and fractional
+    part at once, as a linear phase ramp between one FFT and one IFFT.
+    Stacked signals are delayed in one batch.
+
+    params:
+        signals: Real signal or stack of real signals, shape (..., K)
+        delay_samples: Delay (in samples) of every signal, shape (...)
+    returns:
+        Delayed signals of the same shape, the start is zero filled
+    """
+    K = signals.shape[-1]
+    delay_samples = np.asarray(delay_samples, dtype=float)
+    n_fft = next_fast_len(K + int(np.ceil(np.max(delay_samples))) + FFT_DELAY_GUARD)
+
+    spectra = rfft(signals, n=n_fft, axis=-1)
+    spectra *= _delay_ramp(n_fft, delay_samples).astype(spectra.dtype, copy=False)
+    return irfft(spectra, n=n_fft, axis=-1, overwrite_x=True)[..., :K]
+
+def _delay_ramp(n_fft, delay_samples):
+    # exp(-2j pi k d / n_fft) for the rfft bins k. Splitting k = hi * B + lo
+    # turns it into the product of two short exp tables, which is much
+    # cheaper than an exp per bin and just as accurate in double precision
+    num_bins = n_fft // 2 + 1
+    B = int(np.ceil(np.sqrt(num_bins)))
+    scale = -2j * np.pi * delay_samples[..., None] / n_fft
+    lo = np.exp(scale * np.arange(B))
+    hi = np.exp(scale * np.arange(0, num_bins + B, B))
+    ramp = hi[..., :, None] * lo[..., None, :]
+    return ramp.reshape(*delay_samples.shape, -1)[..., :num_bins]
+
+@lru_cache(maxsize=None)
+def fractional_delay_bank(taps: int = DELAY_TAPS,
+                          resolution: int = DELAY_RESOLUTION,
+                          dtype: type = np.float64) -> np.ndarray:
+    """
+    Polyphase bank of Blackman windowed sinc fractional delay filters, built
+    the first time a (taps, resolution, dtype) combination is used.
+
+    params:
+        taps: Filter length
+        resolution: Number of fractional delay steps per sample
+        dtype: Real dtype of the taps
+    returns:
+        Read-only array of shape (resolution + 1, taps), row p delays by
+        p / resolution samples on top of the (taps - 1) / 2 filter center
+    """
+    n = np.arange(taps)
+    fractions = np.arange(resolution + 1) / resolution
+    h = np.sinc(n - (taps - 1) / 2 - fractions[:, None])
+    h *= np.blackman(taps)
+    h /= np.sum(h, axis=1, keepdims=True)
+    h = h.astype(dtype, copy=False)
+    h.flags.writeable = False
+    return h
+
+def fractional_delay_taps(fractional_delay,
+                          taps: int = DELAY_TAPS,
+                          resolution: int = DELAY_RESOLUTION,
+                          dtype: type = np.float64) -> np.ndarray:
+    """
+    Looks up the filter for a fractional delay in [0, 1] from the bank,
+    rounded to the nearest 1 / resolution samples.
+
+    params:
+        fractional_delay: Fractional delay or array of them (samples)
+        taps: Filter length
+        resolution: Number of fractional delay steps per sample
+        dtype: Real dtype of the taps
+    returns:
+        Taps of shape (taps,), or (..., taps) for an array of delays
+    """
+    index = np.rint(np.asarray(fractional_delay) * resolution).astype(int)
+    return fractional_delay_bank(taps, resolution, np.dtype(dtype))[index]
+
+def propagation_delays(emitter,
+                       receiver_positions: np.ndarray,
+                       times) -> np.ndarray:
+    """
+    Delay of the signal each receiver gets at each time from a moving
+    emitter, i.e. the solution of d = |p(t - d) - r| / c.
+
+    params:
+        emitter: Emitter, its position is the one at time 0
+        receiver_positions: Receiver positions, shape (N, 3)
+        times: Reception times (sec), shape (T,)
+    returns:
+        Delays (sec) of shape (N, T)
+    """
+    c = 299792458.0
+    receiver_positions = np.asarray(receiver_positions, dtype=float)[:, None, :]
+    times = np.asarray(times, dtype=float)
+
+    delays = np.linalg.norm(emitter.position_at(times) - receiver_positions, axis=-1) / c
+    for _ in range(3):
+        # every iteration shrinks the error by a factor of speed / c
+        delays = np.linalg.norm(emitter.position_at(times - delays) - receiver_positions, axis=-1) / c
+    return delays
+
+def moving_emitter_channel(signal: np.ndarray,
+                           emitter,
+                           receiver_positions: np.ndarray,
+                           sample_rate: int,
+                           dtype: type = np.complex128,
+                           max_phase_error: float = MAX_PHASE_ERROR,
+                           max_delay_error: float = MAX_DELAY_ERROR):
+    """
+    Delay and Doppler of a moving emitter that change over the signal. The
+    signal is split into segments, each delayed by its own constant FIR
+    delay and given a quadratic carrier phase fitted to the exact delay at
+    its start, middle and end. Only a few points per segment are solved
+    exactly, so the cost stays close to the fixed geometry receive path.
+
+    Segments are halved until the envelope delay is within max_delay_error
+    of the exact one at the segment ends, and the phase fit is within half
+    of max_phase_error at the quarter points. A smooth delay's cubic
+    remainder peaks within 3% of its quarter point value, so the phase
+    error is bounded by max_phase_error everywhere.
+
+    params:
+        signal: Real sampled waveform, sample 0 is emitted at time 0
+        emitter: The emitter sending the signal
+        receiver_positions: Receiver positions, shape (N, 3)
+        sample_rate: Samples / sec
+        dtype: Complex dtype of the output
+        max_phase_error: Bound on the carrier phase error (radians)
+        max_delay_error: Bound on the envelope delay error (samples)
+    returns:
+        Received signals of shape (N, K), and the delays (sec) and Doppler
+        shifts (Hz) at the first received sample, each of shape (N,)
+    """
+    K = len(signal)
+    N = len(receiver_positions)
+    taps = DELAY_TAPS
+    f0 = emitter.frequency
+    delays_at = lambda samples: propagation_delays(emitter, receiver_positions, samples / sample_rate)
+
+    S = 1 << int(np.ceil(np.log2(max(K, 1))))
+    while True:
+        J = -(-K // S)
+        # exact delays at the start, quarter points, middle and end of every segment
+        d = delays_at(np.arange(4 * J + 1) * (S / 4))
+        start, quarter, mid, three_quarters, end = d[:, 0:-1:4], d[:, 1::4], d[:, 2::4], d[:, 3::4], d[:, 4::4]
+
+        # quadratic through start, middle and end in the segment's local time u in [0, 1]
+        c2 = 2 * (start - 2 * mid + end)
+        c1 = end - start - c2
+        fit_error = np.maximum(np.abs(start + c1 / 4 + c2 / 16 - quarter),
+                               np.abs(start + 3 * c1 / 4 + 9 * c2 / 16 - three_quarters))
+        phase_error = 2 * np.pi * f0 * np.max(fit_error)
+        delay_error = np.max(np.maximum(np.abs(start - mid), np.abs(end - mid))) * sample_rate
+        if (phase_error <= max_phase_error / 2 and delay_error <= max_delay_error) or S == 1:
+            break
+        S //= 2
+
+    # envelope, every segment delayed by its middle delay like add_time_delay does
+    delay_samples = mid * sample_rate
+    integer_delays = np.floor(delay_samples).astype(int)
+    h = fractional_delay_taps(delay_samples - integer_delays, dtype=np.finfo(dtype).dtype)
+
+    # the window of input every segment's 'same' mode filter outputs need
+    lead = taps - 1 - (taps - 1) // 2
+    left = max(int(np.max(integer_delays)), 0) + lead
+    padded = np.zeros(left + J * S + taps, dtype=signal.dtype)
+    padded[left:left + K] = signal
+    windows = sliding_window_view(padded, S + taps - 1)[left + np.arange(J) * S - integer_delays - lead]
+    delayed = oaconvolve(windows, h, mode='valid', axes=-1)
+
+    # carrier phase relative to the first sample, evaluated in place in double precision
+    u = np.arange(S) / S
+    phase = c2[..., None] * u
+    phase += c1[..., None]
+    phase *= u
+    phase += (start - start[:, :1])[..., None]
+    phase *= -2 * np.pi * f0
+    signals = np.empty(phase.shape, dtype=dtype)
+    np.cos(phase, out=signals.real)
+    np.sin(phase, out=signals.imag)
+    signals *= delayed
+    signals = signals.reshape(N, J * S)[:, :K]
+
+    # instantaneous values at the first sample from the exact delays
+    edge = delays_at(np.array([-1., 0., 1.]))
+    dopplers = -f0 * (edge[:, 2] - edge[:, 0]) * sample_rate / 2
+    return signals, edge[:, 1], dopplers
 
 class Emitter: 
     def __init__(self, 
                  frequency: int, 
                  position: np.ndarray,
-                 velocity: np.ndarray):
+                 velocity: np.ndarray,
+                 acceleration: np.ndarray = None): # m / s^2, only used by the time varying channel
         self.frequency = frequency
         self.sample_rate = 20 * self.frequency # 20 samples per cycle for continuous effect when emitting
         self.position = position
         self.velocity = velocity
+        self.acceleration = np.zeros(3) if acceleration is None else acceleration
 
         self.preamble = '101000010100000'
         self.modulator = {'0' : -1, # exp(2pi * j * freq * (0 + pi))
                           '1' : 1} # exp(2pi * j * freq * 1)
 
     def generate_signal(self, 
-                        bits: str):
-        bits = self.preamble + bits
-                
-        symbols = []
+                        bits):
+        """
+        params:
+            bits: Message bits, either a string of '0' and '1' or a uint8
+                array of shape (n,) or a batch of shape (M, n), e.g. from
+                doa_utils.messages
+        returns:
+            Symbols with the preamble prepended, a list for a string message
+            and an int8 array of shape (..., len(preamble) + n) otherwise
+        """
+        if isinstance(bits, str):
+            bits = self.preamble + bits
+
+            symbols = []
+
+            for i, bit in enumerate(bits):
+                symbols.append(self.modulator[bit])
 
-        for i, bit in enumerate(bits):
-            symbols.append(self.modulator[bit])
+            return symbols
 
-        return symbols
+        preamble = np.frombuffer(self.preamble.encode(), dtype=np.uint8) - ord('0')
+        return bits_to_symbols(bits, preamble, (self.modulator['0'], self.modulator['1']))
+
+    def position_at(self, times) -> np.ndarray:
+        """
+        Position (m) at times (sec) relative to when position was taken,
+        shape times.shape + (3,).
+        """
+        t = np.asarray(times, dtype=float)[..., None]
+        return self.position + self.velocity * t + self.acceleration * t**2 / 2
     
 class Receiver:
     def __init__(self, 
                  sample_rate: int, # samples / sec
                  bit_duration: int, # sec / bit
-                 position: np.ndarray): # cartesian position coords
+                 position: np.ndarray, # cartesian position coords
+                 dtype: type = np.complex128, # complex64 keeps the whole receive chain in single precision
+                 modulation: str = 'bpsk', # 'bpsk' or pulse position modulation 'ppm'
+                 delay_method: str = 'fir'): # 'fir' windowed sinc filter or 'fft' phase ramp
         # info about emitter to sample accurately
         self.sample_rate = sample_rate 
         self.bit_duration = bit_duration
         self.position = position
+        self.dtype = np.dtype(dtype)
+        self.real_dtype = np.finfo(self.dtype).dtype
+
+        if modulation not in ('bpsk', 'ppm'):
+            raise ValueError(f"Unknown modulation: {modulation}")
+        self.modulation = modulation
+
+        if delay_method not in ('fir', 'fft'):
+            raise ValueError(f"Unknown delay method: {delay_method}")
+        self.delay_method = delay_method
 
     def sample_signal(self, symbols: List[int]):
+        """
+        Maps symbols to samples, samples_per_bit samples per symbol. A 2D
+        array of symbols is a batch of messages, one per row.
+        """
         samples_per_bit = int(self.sample_rate * self.bit_duration)
-        demodded_signal = np.array([])
-        # manual flag to switch between pulse position modulation and binary phase shift keying 
-        ppm = False 
-        if ppm:
+        symbols = np.asarray(symbols)
+
+        if self.modulation == 'ppm':
+            # a 1 is a pulse in the first half of the bit, anything else in the second half
             half_samples = int(samples_per_bit / 2)
-            for sym in symbols:
-                bit = []
-                if sym == 1:
-                    bit = np.ones(half_samples)
-                    bit = np.append(bit, np.zeros(samples_per_bit - half_samples))
-                else:
-                    bit = np.zeros(half_samples)
-                    bit = np.append(bit, np.ones(samples_per_bit - half_samples))
-                demodded_signal = np.append(demodded_signal, bit)
-        else:
-            for sym in symbols:
-                sym_samples = np.ones(samples_per_bit) * sym
-                demodded_signal = np.append(demodded_signal, sym_samples)
-        return demodded_signal
+            first_half = np.arange(samples_per_bit) < half_samples
+            pulses = np.where((symbols == 1)[..., None], first_half, ~first_half)
+            return pulses.reshape(*symbols.shape[:-1], -1).astype(self.real_dtype)
+        return np.repeat(symbols.astype(self.real_dtype), samples_per_bit, axis=-1)
     
     def apply_doppler(self, 
                       signal: np.ndarray, 
-                      emitter: Emitter):
+                      emitter: Emitter,
+                      start: int = 0): # sample index of signal[0], keeps the phase continuous across blocks
         
         c = 299792458.0
         f0 = emitter.frequency
@@ -71,7 +308,9 @@ class Receiver:
         
         f1 = v/c * f0 # must be in Hz
 
-        doppler_shifted_signal = signal * np.exp(2j*np.pi*f1*np.arange(0, len(signal)) / self.sample_rate)  
+        # the phase is computed in double precision so it stays accurate over long signals
+        phasor = np.exp(2j*np.pi*f1*np.arange(start, start + len(signal)) / self.sample_rate).astype(self.dtype, copy=False)
+        doppler_shifted_signal = signal * phasor
         return doppler_shifted_signal, f1
     
     def add_time_delay(self, 
@@ -83,17 +322,18 @@ class Receiver:
         time_delay_seconds = distance / c
 
         time_delay_samples = time_delay_seconds * self.sample_rate
+        if self.delay_method == 'fft':
+            # exact delay, the FIR path below delays half a sample more
+            time_delayed_signal = fft_fractional_delay(signal.astype(self.real_dtype, copy=False), time_delay_samples)
+            return time_delayed_signal.astype(self.dtype, copy=False), time_delay_seconds
+
         integer_delay = int(time_delay_samples)
         fractional_delay = time_delay_samples - integer_delay
 
-        N = 100
-        n = np.arange(N)
-        h = np.sinc(n - (N - 1) / 2 - fractional_delay)
-        h *= np.blackman(N)
-        h /= np.sum(h)
+        h = fractional_delay_taps(fractional_delay, dtype=self.real_dtype)
 
         time_delayed_signal = np.convolve(signal, h, mode='same')
-        integer_delay_signal = np.zeros(integer_delay, dtype=complex)
+        integer_delay_signal = np.zeros(integer_delay, dtype=self.dtype)
         time_delayed_signal = np.append(integer_delay_signal, time_delayed_signal)
         time_delayed_signal = time_delayed_signal[:len(signal)]
 
@@ -101,8 +341,10 @@ class Receiver:
     
     def signal_to_noise_ratio(self, 
                               signal: np.ndarray, 
-                              distance: float):
-        signal_power = np.sum(np.abs(signal)**2) / len(signal)
+                              distance: float,
+                              signal_power: float = None): # measured from signal when not given
+        if signal_power is None:
+            signal_power = np.sum(np.abs(signal)**2) / len(signal)
         snr_from_distance = lambda x : (1 - 4) / (400000) * x + 4
         snr = snr_from_distance(distance)
         noise_var = signal_power / snr
@@ -110,24 +352,238 @@ class Receiver:
     
     def add_noise(self, 
                   signal: np.ndarray, 
-                  emitter: Emitter):
+                  emitter: Emitter,
+                  signal_power: float = None,
+                  rng: Seed = None): # Generator or seed, numpy's global state when not given
+        rng = as_generator(rng)
         distance = np.linalg.norm(emitter.position - self.position)
-        noise_var = self.signal_to_noise_ratio(signal, distance)
-        real_noise = np.random.normal(0, noise_var**2/2, len(signal))
-        imag_noise = np.random.normal(0, noise_var**2/2, len(signal))
-        noise = real_noise + 1j * imag_noise
+        noise_var = self.signal_to_noise_ratio(signal, distance, signal_power)
+        real_noise = rng.normal(0, noise_var**2/2, len(signal))
+        imag_noise = rng.normal(0, noise_var**2/2, len(signal))
+        noise = (real_noise + 1j * imag_noise).astype(self.dtype, copy=False)
         return signal + noise
     
     def receive(self, 
                 symbols: List[int], 
                 emitter: Emitter,
-                return_true_values: bool = False):
+                return_true_values: bool = False,
+                time_varying: bool = False, # delay and Doppler follow the emitter's motion, always the FIR delay
+                rng: Seed = None):
 
         signal = self.sample_signal(symbols)
-        time_delayed_signal, t = self.add_time_delay(signal, emitter)
-        doppler_signal, f = self.apply_doppler(time_delayed_signal, emitter)
-        noisy_signal = self.add_noise(doppler_signal, emitter)
+        if time_varying:
+            signals, t, f = moving_emitter_channel(signal, emitter, [self.position], self.sample_rate, self.dtype)
+            doppler_signal, t, f = signals[0], t[0], f[0]
+        else:
+            time_delayed_signal, t = self.add_time_delay(signal, emitter)
+            doppler_signal, f = self.apply_doppler(time_delayed_signal, emitter)
+        noisy_signal = self.add_noise(doppler_signal, emitter, rng=rng)
         if return_true_values:
             return noisy_signal, t, f
         else:
-            return noisy_signal
\ No newline at end of file
+            return noisy_signal
+
+    def receive_blocks(self,
+                       symbols: List[int],
+                       emitter: Emitter,
+                       block_size: int = 4096,
+                       rng: Seed = None):
+        """
+        Streaming version of receive, yielding the received signal in blocks
+        so arbitrarily long captures take constant memory. The delay filter
+        state and the Doppler phase carry over between blocks. The delay is
+        always the FIR one, and the noise power is set from the power of the
+        sampled waveform, since the received signal is never held at once.
+
+        params:
+            symbols: Symbols of the message, e.g. from Emitter.generate_signal
+            emitter: The emitter sending the message
+            block_size: Samples per block, the last block may be shorter
+            rng: Generator or seed of the noise, one stream across all blocks
+        returns:
+            Generator of complex blocks, together len(symbols) * samples_per_bit long
+        """
+        c = 299792458.0
+        rng = as_generator(rng)
+        samples_per_bit = int(self.sample_rate * self.bit_duration)
+        symbols = np.asarray(symbols)
+        symbols_per_chunk = max(1, block_size // samples_per_bit)
+        chunks = lambda: (self.sample_signal(symbols[i:i + symbols_per_chunk])
+                          for i in range(0, len(symbols), symbols_per_chunk))
+
+        K = len(symbols) * samples_per_bit
+        signal_power = sum(np.sum(chunk**2, dtype=float) for chunk in chunks()) / K
+
+        distance = np.linalg.norm(emitter.position - self.position)
+        time_delay_samples = distance / c * self.sample_rate
+        integer_delay = int(time_delay_samples)
+        h = fractional_delay_taps(time_delay_samples - integer_delay, dtype=self.real_dtype)
+
+        # like add_time_delay, integer_delay zeros followed by the 'same' mode
+        # convolution, which is the causal filter output minus its first samples
+        pending = np.zeros(integer_delay, dtype=self.real_dtype)
+        skip = (len(h) - 1) // 2
+        zi = np.zeros(len(h) - 1, dtype=self.real_dtype)
+
+        samples = chunks()
+        start = 0
+        while start < K:
+            while len(pending) < min(block_size, K - start):
+                # past the end of the message the filter is flushed with zeros
+                chunk = next(samples, None)
+                if chunk is None:
+                    chunk = np.zeros(block_size, dtype=self.real_dtype)
+                filtered, zi = lfilter(h, 1, chunk, zi=zi)
+                dropped = min(skip, len(filtered))
+                skip -= dropped
+                pending = np.concatenate((pending, filtered[dropped:]))
+
+            n = min(block_size, K - start)
+            block, pending = pending[:n].astype(self.dtype), pending[n:]
+            block, _ = self.apply_doppler(block, emitter, start=start)
+            yield self.add_noise(block, emitter, signal_power, rng)
+            start += n
+
+class ReceiverArray:
+    """
+    All receivers of a scene at once. The waveform is sampled once and every
+    receiver's delay, Doppler and noise is applied to an (N, K) array in
+    vectorized form, matching what Receiver.receive does for one receiver.
+    """
+    def __init__(self,
+                 sample_rate: int, # samples / sec
+                 bit_duration: int, # sec / bit
+                 positions: List[np.ndarray], # cartesian position coords of every receiver
+                 dtype: type = np.complex128,
+                 modulation: str = 'bpsk',
+                 delay_method: str = 'fir'):
+        self.receivers = [Receiver(sample_rate, bit_duration, np.asarray(pos), dtype=dtype, modulation=modulation,
+                                   delay_method=delay_method) for pos in positions]
+        self.sample_rate = sample_rate
+        self.bit_duration = bit_duration
+        self.positions = np.array(positions, dtype=float)
+        self.dtype = np.dtype(dtype)
+        self.real_dtype = np.finfo(self.dtype).dtype
+        self.delay_method = delay_method
+
+    def __len__(self):
+        return len(self.receivers)
+
+    def apply_doppler(self,
+                      signals: np.ndarray,
+                      emitter: Emitter):
+
+        c = 299792458.0
+        f0 = emitter.frequency
+        offsets = self.positions - emitter.position
+        distances = np.linalg.norm(offsets, axis=1)
+        v = offsets @ emitter.velocity / distances # velocity in direction of each receiver m/s
+
+        f1 = v/c * f0 # must be in Hz
+
+        phasors = np.exp(2j*np.pi*f1[:, None]*np.arange(0, signals.shape[-1]) / self.sample_rate).astype(self.dtype, copy=False)
+        return signals * phasors, f1
+
+    def add_time_delay(self,
+                       signal: np.ndarray,
+                       emitter: Emitter):
+
+        c = 299792458.0
+        distances = np.linalg.norm(emitter.position - self.positions, axis=1)
+        time_delay_seconds = distances / c
+
+        time_delay_samples = time_delay_seconds * self.sample_rate
+        if self.delay_method == 'fft':
+            signals = np.broadcast_to(signal.astype(self.real_dtype, copy=False), (len(self), len(signal)))
+            return fft_fractional_delay(signals, time_delay_samples).astype(self.dtype, copy=False), time_delay_seconds
+
+        integer_delays = time_delay_samples.astype(int)
+        fractional_delays = time_delay_samples - integer_delays
+
+        # one row of windowed sinc taps per receiver
+        h = fractional_delay_taps(fractional_delays, dtype=self.real_dtype)
+
+        K = len(signal)
+        filtered = oaconvolve(np.broadcast_to(signal, (len(self), K)), h, mode='same', axes=-1)
+        time_delayed_signals = np.zeros((len(self), K), dtype=self.dtype)
+        for row, integer_delay in enumerate(integer_delays):
+            time_delayed_signals[row, integer_delay:] = filtered[row, :max(K - integer_delay, 0)]
+
+        return time_delayed_signals, time_delay_seconds
+
+    def add_noise(self,
+                  signals: np.ndarray,
+                  emitter: Emitter,
+                  rng: Seed = None):
+        """
+        Adds every receiver's noise. Given a Generator or seed, each receiver
+        draws from its own stream spawned from it, the same noise as
+        Receiver.add_noise with rng=spawn(rng, N)[i]. Otherwise the noise
+        comes from numpy's global state, in the same order as calling
+        Receiver.add_noise on every receiver in turn.
+        """
+        distances = np.linalg.norm(emitter.position - self.positions, axis=1)
+        signal_power = np.sum(np.abs(signals)**2, axis=1) / signals.shape[1]
+        snr = (1 - 4) / (400000) * distances + 4 # same distance model as Receiver.signal_to_noise_ratio
+        noise_var = signal_power / snr
+
+        if rng is None:
+            noise = np.random.normal(0, 1, (len(self), 2, signals.shape[1]))
+        else:
+            noise = np.array([stream.normal(0, 1, (2, signals.shape[1])) for stream in spawn(rng, len(self))])
+        noise *= (noise_var**2/2)[:, None, None]
+        noise = (noise[:, 0] + 1j * noise[:, 1]).astype(self.dtype, copy=False)
+        return signals + noise
+
+    def receive(self,
+                symbols: List[int],
+                emitter: Emitter,
+                return_true_values: bool = False,
+                time_varying: bool = False,
+                rng: Seed = None):
+        """
+        Receives one message at every receiver.
+
+        params:
+            symbols: Symbols of the message, e.g. from Emitter.generate_signal
+            emitter: The emitter sending the message
+            return_true_values: Also return the true TDOA and FDOA
+            time_varying: Let the delay and Doppler follow the emitter's
+                motion over the message with moving_emitter_channel, always
+                with the FIR delay
+            rng: Generator or seed the per receiver noise streams are spawned
+                from, numpy's global state when not given
+        returns:
+            Received signals of shape (N, K), and if return_true_values the true
+            TDOA (sec) and FDOA (Hz) of every receiver relative to the first,
+            at the first received sample when time_varying
+        """
+        signal = self.receivers[0].sample_signal(symbols)
+        if time_varying:
+            doppler_signals, t, f = moving_emitter_channel(signal, emitter, self.positions, self.sample_rate, self.dtype)
+        else:
+            time_delayed_signals, t = self.add_time_delay(signal, emitter)
+            doppler_signals, f = self.apply_doppler(time_delayed_signals, emitter)
+        noisy_signals = self.add_noise(doppler_signals, emitter, rng)
+        if return_true_values:
+            return noisy_signals, t - t[0], f - f[0]
+        else:
+            return noisy_signals
+
+    def receive_blocks(self,
+                       symbols: List[int],
+                       emitter: Emitter,
+                       block_size: int = 4096,
+                       rng: Seed = None):
+        """
+        Streaming version of receive, see Receiver.receive_blocks. Given a
+        Generator or seed, every receiver's noise comes from its own spawned
+        stream like in add_noise.
+
+        returns:
+            Generator of (N, block_size) blocks, the last may be shorter
+        """
+        streams = [receiver.receive_blocks(symbols, emitter, block_size, stream)
+                   for receiver, stream in zip(self.receivers, spawn(rng, len(self)))]
+        for blocks in zip(*streams):
+            yield np.stack(blocks)
@@ -2,21 +2,72 @@ from typing import Optional, List
 
 import matplotlib.pyplot as plt
 import numpy as np
-import random
 import pymap3d as pm
 
-from .signal_generator import Emitter, Receiver
-from .caf import convolution_caf, fft_caf
+from .signal_generator import Emitter, ReceiverArray
+from .messages import random_bits
+from .rng import Seed, spawn
+from .caf import all_pairs_caf, batched_fft_caf, convolution_caf, gcc, refine_caf_peak
 from .solver import estimate_emitter, fdoa_with_tdoa
 
+c = 299792458.0 # speed of light in m/s
+
+def caf_search_bounds(receiver_positions: List[np.ndarray],
+                      sampling_rate: float,
+                      max_emitter_speed: float,
+                      emitter_freq: float = 1090e6,
+                      reference: int = 0,
+                      pairs: Optional[List[tuple]] = None):
+    """
+    Physically possible CAF search window of every receiver against the
+    reference receiver, so closely spaced receivers search only a few lags.
+
+    params:
+        receiver_positions: Cartesian receiver positions (m)
+        sampling_rate: Sampling rate of the receivers (samples / sec)
+        max_emitter_speed: Largest expected emitter speed (m / s)
+        emitter_freq: Carrier frequency of the emitter (Hz)
+        reference: Index of the reference receiver
+        pairs: List of (i, j) receiver index pairs to bound instead of the
+            reference against every other receiver
+    returns:
+        Max time shifts (samples) and max frequency shifts (cycles / sample)
+        of every receiver except the reference, or of every pair
+    """
+    positions = np.asarray(receiver_positions, dtype=float)
+    if pairs is None:
+        baselines = np.linalg.norm(np.delete(positions, reference, axis=0) - positions[reference], axis=1)
+    else:
+        first, second = np.array(pairs, dtype=int).reshape(-1, 2).T
+        baselines = np.linalg.norm(positions[second] - positions[first], axis=1)
+
+    # a range difference can't exceed the baseline, the extra sample covers
+    # the spread of the fractional delay filter
+    max_time_shifts = np.ceil(baselines / c * sampling_rate).astype(int) + 1
+
+    # radial velocities towards two receivers differ by at most twice the speed
+    max_freq_shift = 2 * max_emitter_speed / c * emitter_freq / sampling_rate
+    max_freq_shifts = np.full(len(baselines), max_freq_shift)
+
+    return max_time_shifts, max_freq_shifts
+
 def simulate_doa(emitter_position: np.ndarray,
                  emitter_velocity: np.ndarray,  
                  receiver_positions: List[np.ndarray], 
-                 message: Optional[str]=None, 
+                 message: Optional[str]=None, # bits as a string or a uint8 array
                  emitter_freq: Optional[int] = 1090e6, 
                  sampling_rate: Optional[int] = 21.80e6,
                  bit_duration: Optional[float] = 1e-6, 
-                 cartesian: Optional[bool] = True
+                 cartesian: Optional[bool] = True,
+                 caf_method: Optional[str] = 'fft',
+                 dtype: Optional[type] = np.complex128,
+                 refine_peaks: Optional[str] = None,
+                 max_emitter_speed: Optional[float] = 350.0,
+                 gcc_weighting: Optional[str] = 'phat',
+                 modulation: Optional[str] = 'bpsk',
+                 delay_method: Optional[str] = 'fir',
+                 time_varying: Optional[bool] = False,
+                 rng: Seed = None # Generator or seed, numpy's global state when not given
                  ):
     
     assert len(receiver_positions) >= 4, "At least 4 receivers are needed to simulate DOA in 3d"
@@ -27,49 +78,82 @@ def simulate_doa(emitter_position: np.ndarray,
         emitter_position = pm.geodetic2enu(*emitter_position, lat0, lon0, h0)
         receiver_positions = [pm.geodetic2enu(*pos, lat0, lon0, h0) for pos in receiver_positions]
         
+    # separate message and noise streams, so a given message doesn't change the noise
+    message_rng, noise_rng = spawn(rng, 2)
     if message is None:
-        message = ''.join([random.choice('01') for _ in range(2000)])
+        message = random_bits(2000, rng=message_rng)
 
     emitter = Emitter(emitter_freq, np.array(emitter_position), np.array(emitter_velocity))
-    receivers = [Receiver(sampling_rate, bit_duration, np.array(pos)) for pos in receiver_positions]
+    receiver_array = ReceiverArray(sampling_rate, bit_duration, [np.array(pos) for pos in receiver_positions],
+                                   dtype=dtype, modulation=modulation, delay_method=delay_method)
+    receivers = receiver_array.receivers
 
     symbols = emitter.generate_signal(message)
-    signals = []
-    true_tdoa_values = []
-    true_fdoa_values = []
-
-    for receiver in receivers:
-        signal, tdoa, fdoa = receiver.receive(symbols, emitter, return_true_values=True)
-        signals.append(signal)
-        true_tdoa_values.append(tdoa)
-        true_fdoa_values.append(fdoa)
-
-    true_tdoa_values = [t - true_tdoa_values[0] for t in true_tdoa_values]
-    true_fdoa_values = [f - true_fdoa_values[0] for f in true_fdoa_values]
+    signals, true_tdoa_values, true_fdoa_values = receiver_array.receive(symbols, emitter, return_true_values=True,
+                                                                         time_varying=time_varying, rng=noise_rng)
+    true_tdoa_values = list(true_tdoa_values)
+    true_fdoa_values = list(true_fdoa_values)
 
     fft_fdoa_values = [0]
     fft_tdoa_values = [0]
     conv_fdoa_values = [0]   
     conv_tdoa_values = [0]
 
-    for s in signals[1:]:
-        _, tshift, fshift, _, _ = fft_caf(signals[0], s, 150)
-        fft_fdoa_values.append(fshift * receiver.sample_rate)
-        fft_tdoa_values.append(tshift / receiver.sample_rate)
-        # _, tshift, fshift, _, _ = convolution_caf(signals[0], s, 11)
-        # conv_fdoa_values.append(fshift * receiver.sample_rate)
-        # conv_tdoa_values.append(tshift / receiver.sample_rate)
-    
-    fft_est_emitter = estimate_emitter(receivers, fft_fdoa_values, fft_tdoa_values)
-    true_est_emitter = estimate_emitter(receivers, true_fdoa_values, true_tdoa_values)
+    if caf_method == 'all_pairs':
+        # every receiver against every other, so no single capture is in all measurements
+        pairs = [(i, j) for i in range(len(receivers)) for j in range(i + 1, len(receivers))]
+    else:
+        pairs = [(0, i) for i in range(1, len(receivers))]
+
+    max_time_shifts, max_freq_shifts = caf_search_bounds(receiver_positions, sampling_rate, max_emitter_speed, emitter_freq,
+                                                         pairs=pairs)
+
+    if caf_method == 'fft':
+        tshifts, fshifts, _, _ = batched_fft_caf(signals[0], signals[1:], max_time_shifts, fast_len=True,
+                                                 max_freq_shift=max_freq_shifts)
+    elif caf_method == 'convolution':
+        # convolution_caf steps 2 FFT bins per frequency shift
+        half_shifts = int(np.ceil(max_freq_shifts[0] * len(signals[0]) / 2))
+        caf_estimates = [convolution_caf(signals[0], s, 2 * half_shifts + 1, max_time_shift=max_time_shift)[1:3]
+                         for s, max_time_shift in zip(signals[1:], max_time_shifts)]
+        tshifts, fshifts = np.array(caf_estimates).T
+    elif caf_method == 'all_pairs':
+        _, tshifts, fshifts, _ = all_pairs_caf(signals, max_time_shifts, max_freq_shifts, pairs)
+    elif caf_method == 'gcc':
+        # TDOA only, the peaks are already fractional
+        _, tshifts, _ = gcc(signals, max_time_shifts, pairs, weighting=gcc_weighting)
+    else:
+        raise ValueError(f"Unknown CAF method: {caf_method}")
+
+    if refine_peaks is not None and caf_method != 'gcc':
+        # 'parabolic' or 'phase' interpolation to fractional samples and FFT bins
+        refined = [refine_caf_peak(signals[i], signals[j], tshift, fshift, refine_peaks) for (i, j), tshift, fshift in zip(pairs, tshifts, fshifts)]
+        tshifts, fshifts = np.array(refined).T
+
+    if caf_method == 'gcc':
+        fft_tdoa_values.extend(tshifts / sampling_rate)
+        fft_est_emitter = estimate_emitter(receivers, toa_data=fft_tdoa_values)
+    elif caf_method == 'all_pairs':
+        # one residual per pair, the measurements are already pair differences
+        fft_est_emitter = estimate_emitter(receivers, list(fshifts * sampling_rate), list(tshifts / sampling_rate), pairs=pairs)
+    else:
+        fft_fdoa_values.extend(fshifts * sampling_rate)
+        fft_tdoa_values.extend(tshifts / sampling_rate)
+        fft_est_emitter = estimate_emitter(receivers, fft_fdoa_values, fft_tdoa_values)
+
+    # the solver takes FDOA as the CAF measures it, the reference receiver's
+    # Doppler minus the other's, while the true values are the other way round
+    true_solver_fdoa = [-f for f in true_fdoa_values]
+    true_est_emitter = estimate_emitter(receivers, true_solver_fdoa, true_tdoa_values)
     Z = np.array([emitter_position[0], emitter_position[1], emitter_position[2], emitter_velocity[0], emitter_velocity[1], emitter_velocity[2]])
-    print(f"Functions at true pos + vel: {fdoa_with_tdoa(Z, receiver_positions, true_tdoa_values, true_tdoa_values)}")
+    print(f"Functions at true pos + vel: {fdoa_with_tdoa(Z, receiver_positions, true_solver_fdoa, true_tdoa_values)}")
     # conv_est_emitter = estimate_emitter(receivers, conv_fdoa_values, conv_tdoa_values)
 
-    fft_pos = -fft_est_emitter[:3]
-    fft_vel = -fft_est_emitter[3:]
+    fft_pos = fft_est_emitter[:3]
+    # the TDOA only solution of gcc has no velocity
+    fft_vel = fft_est_emitter[3:] if caf_method != 'gcc' else np.full(3, np.nan)
     true_pos = true_est_emitter[:3]
-    true_vel = -true_est_emitter[3:]
+    true_vel = true_est_emitter[3:]
     # conv_pos = conv_est_emitter[:3]
     # conv_vel = conv_est_emitter[3:]
 
@@ -12,6 +12,7 @@ def estimate_emitter(
         fdoa_data: Optional[List[float]] = None,
         toa_data: Optional[List[float]] = None,
         emitter_velocity: Optional[np.ndarray] = None,
+        pairs: Optional[List[tuple]] = None,
                    ) -> np.ndarray:
     """
     Given a list of receivers and some set of measured data, selects the 
@@ -22,30 +23,40 @@ def estimate_emitter(
         fdoa_data: List of FDOA measurements
         toa_data: List of TDOA measurements
         emitter_velocity: Velocity of the emitter
+        pairs: List of (i, j) receiver index pairs the measurements belong to.
+            When given, fdoa_data and toa_data hold one difference per pair
+            (receiver j minus receiver i) instead of one value per receiver
     returns:
         Estimated emitter position
     
     """
-    receiver_X_list = [receiver.position for receiver in receivers]
+    receiver_X_list = np.array([receiver.position for receiver in receivers], dtype=float)
     
     # let initial guess be centroid I guess? Until we have a more sophisticated search algo.
     x0 = np.sum(receiver_X_list, axis=0) / len(receiver_X_list)
     if fdoa_data and toa_data:
         v0 = np.zeros(x0.shape)
         x0 = np.concatenate((x0, v0))
-        obj = lambda Z : fdoa_with_tdoa(Z, receiver_X_list, fdoa_data, toa_data)
+        obj = lambda Z : fdoa_with_tdoa(Z, receiver_X_list, fdoa_data, toa_data, pairs)
+        jac = lambda Z : fdoa_with_tdoa_jacobian(Z, receiver_X_list, fdoa_data, toa_data, pairs)
     elif fdoa_data is not None and emitter_velocity is not None:
-        obj = lambda X : fdoa_v_known(X, emitter_velocity, receiver_X_list, fdoa_data)
+        obj = lambda X : fdoa_v_known(X, emitter_velocity, receiver_X_list, fdoa_data, pairs)
+        jac = lambda X : fdoa_v_known_jacobian(X, emitter_velocity, receiver_X_list, fdoa_data, pairs)
     elif toa_data:
-        obj = lambda X : tdoa(X, receiver_X_list, toa_data)
+        obj = lambda X : tdoa(X, receiver_X_list, toa_data, pairs)
+        jac = lambda X : tdoa_jacobian(X, receiver_X_list, toa_data, pairs)
     elif fdoa_data:
         v0 = np.zeros(x0.shape)
         x0 = np.concatenate((x0, v0))
-        obj = lambda Z : fdoa_v_unknown(Z, receiver_X_list, fdoa_data)
+        obj = lambda Z : fdoa_v_unknown(Z, receiver_X_list, fdoa_data, pairs)
+        jac = lambda Z : fdoa_v_unknown_jacobian(Z, receiver_X_list, fdoa_data, pairs)
     else:
         raise ValueError("Need at least one type of data to solve for emitter position")
 
-    solution = least_squares(obj, x0)
+    # MINPACK's Levenberg-Marquardt costs far less per iteration than the
+    # default trust region method, but needs at least as many equations as unknowns
+    method = 'lm' if len(obj(x0)) >= len(x0) else 'trf'
+    solution = least_squares(obj, x0, jac=jac, method=method)
     if solution.success:
         return solution.x
     else:
@@ -53,59 +64,12 @@ def estimate_emitter(
         return solution.x
     
 
-def const_fdoa(
-        X: np.ndarray, 
-        V: np.ndarray, 
-        X1: np.ndarray, 
-        X2: np.ndarray, 
-        f1: float, 
-        f2: float) -> float:
-    """
-    Gives the equation for line of constant FDOA between two receivers and an emitter
-    
-    params:
-        X: Position of the emitter
-        V: Velocity of the emitter
-        X1: Position of the first receiver
-        X2: Position of the second receiver
-        f1: FDOA at the first receiver
-        f2: FDOA at the second receiver
-    returns:
-        The value of the equation at the given point
-    """
-    vel1 = np.dot(V, (X - X1))
-    vel2 = np.dot(V, (X - X2))
-    dist1 = np.linalg.norm(X- X1)
-    dist2 = np.linalg.norm(X- X2)
-    return (vel1 / dist1 - vel2 / dist2 - c / f0 * (f1 - f2))
-
-def const_tdoa(
-        X: np.ndarray, 
-        X1: np.ndarray, 
-        X2: np.ndarray, 
-        t1: float, 
-        t2: float) -> float:
-    """
-    Gives the equation for line of constant TDOA between two receivers and an emitter
-    
-    params:
-        X: Position of the emitter
-        X1: Position of the first receiver
-        X2: Position of the second receiver
-        t1: TDOA at the first receiver
-        t2: TDOA at the second receiver
-    returns:
-        The value of the equation at the given point
-    """
-    dist1 = np.linalg.norm(X- X1)
-    dist2 = np.linalg.norm(X- X2)
-    return dist1 - dist2 - (t1 - t2) * c
-
 def fdoa_v_known(
         X: np.ndarray, 
         V: np.ndarray, 
         receiver_X_list: List[np.ndarray], 
-        fdoa_list: List[float]) -> List[float]:
+        fdoa_list: List[float],
+        pairs: Optional[List[tuple]] = None) -> np.ndarray:
     """
     Objective function for least squares optimization of emitter position
     when emitter velocity is known or being approximated.
@@ -115,6 +79,7 @@ def fdoa_v_known(
         V: Velocity of the emitter
         receiver_X_list: List of receiver positions
         fdoa_list: List of FDOA measurements
+        pairs: Receiver index pairs of the measurements, see estimate_emitter
     returns:
         The value of the objective function at the given point
     """
@@ -124,16 +89,33 @@ def fdoa_v_known(
     if dims == 3 and len(receiver_X_list) < 4:
         raise ValueError("Need at least 4 receivers for 3D")
     
-    assert len(receiver_X_list) == len(fdoa_list)
+    first, second, f1, f2 = _difference_terms(receiver_X_list, fdoa_list, pairs)
+    _, range_rates, _ = _receiver_terms(X, V, receiver_X_list)
+    return range_rates[first] - range_rates[second] - c / f0 * (f1 - f2)
+
+def fdoa_v_known_jacobian(
+        X: np.ndarray, 
+        V: np.ndarray, 
+        receiver_X_list: List[np.ndarray], 
+        fdoa_list: List[float],
+        pairs: Optional[List[tuple]] = None) -> np.ndarray:
+    """
+    Jacobian of fdoa_v_known with respect to the emitter position, passed to
+    least_squares instead of finite differences.
 
-    ref = receiver_X_list[0]
-    f1 = fdoa_list[0]
-    return [const_fdoa(X, V, ref, receiver_X_list[i], f1, fdoa_list[i]) for i in range(1, len(receiver_X_list))]
+    returns:
+        Array of shape (equations, dims)
+    """
+    first, second, _, _ = _difference_terms(receiver_X_list, fdoa_list, pairs)
+    _, _, gradients = _receiver_terms(X, V, receiver_X_list)
+    gradients = gradients[:, :X.shape[0]]
+    return gradients[first] - gradients[second]
 
 def fdoa_v_unknown(
         Z: np.ndarray, 
         receiver_X_list: List[np.ndarray], 
-        fdoa_list: List[float]) -> List[float]:
+        fdoa_list: List[float],
+        pairs: Optional[List[tuple]] = None) -> np.ndarray:
     """
     Objective function for least squares optimization of emitter position
     and velocity when emitter velocity is unknown.
@@ -142,6 +124,7 @@ def fdoa_v_unknown(
         Z: Concatenation of emitter position and velocity
         receiver_X_list: List of receiver positions
         fdoa_list: List of FDOA measurements
+        pairs: Receiver index pairs of the measurements, see estimate_emitter
     returns:
         The value of the objective function at the given point
     """
@@ -154,17 +137,33 @@ def fdoa_v_unknown(
     if dims == 3 and len(receiver_X_list) < 7:
         raise ValueError("Need at least 7 receivers for 3D")
     
-    assert len(receiver_X_list) == len(fdoa_list)
+    first, second, f1, f2 = _difference_terms(receiver_X_list, fdoa_list, pairs)
+    _, range_rates, _ = _receiver_terms(X, V, receiver_X_list)
+    return range_rates[first] - range_rates[second] - c / f0 * (f1 - f2)
 
-    ref = receiver_X_list[0]
-    f1 = fdoa_list[0]
-    return [const_fdoa(X, V, ref, receiver_X_list[i], f1, fdoa_list[i]) for i in range(1, len(receiver_X_list))]
+def fdoa_v_unknown_jacobian(
+        Z: np.ndarray, 
+        receiver_X_list: List[np.ndarray], 
+        fdoa_list: List[float],
+        pairs: Optional[List[tuple]] = None) -> np.ndarray:
+    """
+    Jacobian of fdoa_v_unknown with respect to the emitter position and
+    velocity, passed to least_squares instead of finite differences.
+
+    returns:
+        Array of shape (equations, 2 * dims)
+    """
+    mid = Z.shape[0] // 2
+    first, second, _, _ = _difference_terms(receiver_X_list, fdoa_list, pairs)
+    _, _, gradients = _receiver_terms(Z[:mid], Z[mid:], receiver_X_list)
+    return gradients[first] - gradients[second]
 
 def fdoa_with_tdoa(
         Z: np.ndarray, 
         receiver_X_list: List[np.ndarray], 
         fdoa_list: List[float], 
-        toa_list: List[float]) -> List[float]:
+        toa_list: List[float],
+        pairs: Optional[List[tuple]] = None) -> np.ndarray:
     """
     Objective function for least squares optimization of emitter position
     and velocity when emitter velocity is unknown but TDOA data is present
@@ -175,6 +174,7 @@ def fdoa_with_tdoa(
         fdoa_list: List of FDOA measurements
         toa_list: List of relative TOA measurements, i.e. if toa_list = np.array([0, 10])
             then the second receiver received the signal 10 seconds after the first
+        pairs: Receiver index pairs of the measurements, see estimate_emitter
     """
     mid = Z.shape[0] // 2
     X = Z[:mid]
@@ -186,20 +186,41 @@ def fdoa_with_tdoa(
     if dims == 3 and len(receiver_X_list) < 4:
         raise ValueError("Need at least 4 receivers for 3D")
     
-    assert len(receiver_X_list) == len(fdoa_list) == len(toa_list)
+    assert len(fdoa_list) == len(toa_list)
 
-    ref = receiver_X_list[0]
-    f1 = fdoa_list[0]
-    t1 = toa_list[0]
-    
-    fdoa_eqns = [const_fdoa(X, V, ref, receiver_X_list[i], f1, fdoa_list[i]) for i in range(1, len(receiver_X_list))]
-    tdoa_eqns = [const_tdoa(X, ref, receiver_X_list[i], t1, toa_list[i]) for i in range(1, len(receiver_X_list))]
-    return fdoa_eqns + tdoa_eqns
+    first, second, f1, f2 = _difference_terms(receiver_X_list, fdoa_list, pairs)
+    _, _, t1, t2 = _difference_terms(receiver_X_list, toa_list, pairs)
+    distances, range_rates, _ = _receiver_terms(X, V, receiver_X_list)
+    fdoa_eqns = range_rates[first] - range_rates[second] - c / f0 * (f1 - f2)
+    tdoa_eqns = distances[first] - distances[second] - (t1 - t2) * c
+    return np.concatenate((fdoa_eqns, tdoa_eqns))
+
+def fdoa_with_tdoa_jacobian(
+        Z: np.ndarray, 
+        receiver_X_list: List[np.ndarray], 
+        fdoa_list: List[float], 
+        toa_list: List[float],
+        pairs: Optional[List[tuple]] = None) -> np.ndarray:
+    """
+    Jacobian of fdoa_with_tdoa with respect to the emitter position and
+    velocity, passed to least_squares instead of finite differences. The
+    TDOA equations don't depend on the velocity.
+
+    returns:
+        Array of shape (fdoa + tdoa equations, 2 * dims)
+    """
+    mid = Z.shape[0] // 2
+    first, second, _, _ = _difference_terms(receiver_X_list, fdoa_list, pairs)
+    _, _, gradients = _receiver_terms(Z[:mid], Z[mid:], receiver_X_list)
+    tdoa_gradients = np.zeros_like(gradients)
+    tdoa_gradients[:, :mid] = gradients[:, mid:] # the unit vector from each receiver is also the range gradient
+    return np.concatenate((gradients[first] - gradients[second], tdoa_gradients[first] - tdoa_gradients[second]))
 
 def tdoa(
         X: np.ndarray, 
         receiver_X_list: List[np.ndarray], 
-        toa_list: List[float]) -> List[float]:
+        toa_list: List[float],
+        pairs: Optional[List[tuple]] = None) -> np.ndarray:
     """
     Objective function for least squares optimization of emitter position
     when only using TDOA data.
@@ -209,6 +230,7 @@ def tdoa(
         receiver_X_list: List of receiver positions
         toa_list: List of relative TOA measurements, i.e. if toa_list = np.array([0, 10])
             then the second receiver received the signal 10 seconds after the first
+        pairs: Receiver index pairs of the measurements, see estimate_emitter
     returns:
         The value of the objective function at the given point
     """
@@ -218,10 +240,47 @@ def tdoa(
     if dims == 3 and len(receiver_X_list) < 4:
         raise ValueError("Need at least 4 receivers for 3D")
     
-    assert len(receiver_X_list) == len(toa_list)
+    first, second, t1, t2 = _difference_terms(receiver_X_list, toa_list, pairs)
+    distances = np.linalg.norm(X - np.asarray(receiver_X_list, dtype=float), axis=1)
+    return distances[first] - distances[second] - (t1 - t2) * c
+
+def tdoa_jacobian(
+        X: np.ndarray, 
+        receiver_X_list: List[np.ndarray], 
+        toa_list: List[float],
+        pairs: Optional[List[tuple]] = None) -> np.ndarray:
+    """
+    Jacobian of tdoa with respect to the emitter position, passed to
+    least_squares instead of finite differences.
+
+    returns:
+        Array of shape (equations, dims)
+    """
+    first, second, _, _ = _difference_terms(receiver_X_list, toa_list, pairs)
+    offsets = X - np.asarray(receiver_X_list, dtype=float)
+    units = offsets / np.linalg.norm(offsets, axis=1)[:, None]
+    return units[first] - units[second]
 
-    ref = receiver_X_list[0]
-    t1 = toa_list[0]
+def _difference_terms(receiver_X_list, data_list, pairs):
+    # receiver indices (first, second) and values (value1, value2) of every
+    # difference equation, the reference against each other receiver, or one
+    # per measured pair where data_list already holds the difference of the pair
+    data = np.asarray(data_list, dtype=float)
+    if pairs is None:
+        assert len(receiver_X_list) == len(data)
+        return np.zeros(len(data) - 1, dtype=int), np.arange(1, len(data)), data[0], data[1:]
 
-    return [const_tdoa(X, ref, receiver_X_list[i], t1, toa_list[i]) for i in range(1, len(receiver_X_list))]
+    assert len(pairs) == len(data)
+    first, second = np.asarray(pairs, dtype=int).reshape(-1, 2).T
+    return first, second, 0, data
 
+def _receiver_terms(X, V, receiver_X_list):
+    # distance and range rate of every receiver, the terms the TDOA and FDOA
+    # equations difference, and the gradient of the range rate by position
+    # then velocity, shape (N, 2 * dims)
+    offsets = X - np.asarray(receiver_X_list, dtype=float)
+    distances = np.sqrt(np.einsum('ij,ij->i', offsets, offsets))
+    units = offsets / distances[:, None]
+    range_rates = units @ V
+    gradients = np.concatenate(((V - range_rates[:, None] * units) / distances[:, None], units), axis=1)
+    return distances, range_rates, gradients
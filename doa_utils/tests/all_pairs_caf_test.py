@@ -0,0 +1,47 @@
+import numpy as np
+
+from doa_utils.caf import all_pairs_caf, fft_caf
+from doa_utils.signal_generator import Receiver
+from doa_utils.solver import c, f0, estimate_emitter
+
+def test_all_pairs_caf():
+    K = 4000
+    max_time_shift = 20
+    max_freq_shift = 6 / K
+    base = np.random.randn(K) + 1j * np.random.randn(K)
+    shifts = [(0, 0), (5, 3), (-7, -2), (12, 0)] # (delay in samples, doppler in bins)
+    sigs = np.array([np.roll(base, d) * np.exp(2j * np.pi * f * np.arange(K) / K) for d, f in shifts])
+
+    pairs, time_shifts, freq_shifts, max_mags = all_pairs_caf(sigs, max_time_shift, max_freq_shift)
+    assert len(pairs) == len(shifts) * (len(shifts) - 1) // 2
+
+    # same peaks as correlating every pair on its own
+    for (i, j), time_shift, freq_shift, max_mag in zip(pairs, time_shifts, freq_shifts, max_mags):
+        _, expected_time, expected_freq, expected_mag, _ = fft_caf(sigs[i], sigs[j], max_time_shift)
+        print((i, j), time_shift, freq_shift * K, expected_time, expected_freq * K)
+        assert time_shift == expected_time
+        assert np.isclose(freq_shift, expected_freq)
+        assert np.isclose(max_mag, expected_mag)
+
+def test_pairwise_solver():
+    emitter_position = np.array([1000., 2000, 3000])
+    emitter_velocity = np.array([0, -70., 0])
+    receiver_positions = [np.array(pos, dtype=float) for pos in
+                          ([0, 0, 0], [1000, 0, 0], [0, 1000, 0], [0, 0, 1000], [800, 800, 100])]
+    receivers = [Receiver(21.80e6, 1e-6, pos) for pos in receiver_positions]
+
+    # exact pair differences, receiver j minus receiver i
+    distances = [np.linalg.norm(emitter_position - pos) for pos in receiver_positions]
+    radial = [np.dot(emitter_velocity, emitter_position - pos) / d for pos, d in zip(receiver_positions, distances)]
+    pairs = [(i, j) for i in range(len(receivers)) for j in range(i + 1, len(receivers))]
+    toa_data = [(distances[j] - distances[i]) / c for i, j in pairs]
+    fdoa_data = [(radial[j] - radial[i]) * f0 / c for i, j in pairs]
+
+    estimate = estimate_emitter(receivers, fdoa_data, toa_data, pairs=pairs)
+    print(estimate)
+    assert np.allclose(estimate[:3], emitter_position, atol=1)
+    assert np.allclose(estimate[3:], emitter_velocity, atol=1)
+
+if __name__ == '__main__':
+    test_all_pairs_caf()
+    test_pairwise_solver()
@@ -0,0 +1,25 @@
+import numpy as np
+
+from doa_utils.caf import batched_fft_caf, fft_caf
+from doa_utils.messages import df17_frames
+from doa_utils.signal_generator import Emitter, ReceiverArray
+
+def test_batched_fft_caf_matches_pairs():
+    emitter = Emitter(1090e6, np.array([3000., -2000, 4000]), np.array([200., 150, 0]))
+    positions = [np.array(pos, dtype=float) for pos in
+                 ([0, 0, 0], [1000, 0, 0], [0, 1000, 0], [0, 0, 1000], [800, 800, 100])]
+    signals = ReceiverArray(21.80e6, 1e-6, positions).receive(emitter.generate_signal(df17_frames(rng=3)), emitter, rng=3)
+
+    # a different window per receiver, and a lag chunk that leaves a shorter last chunk
+    max_time_shifts = np.array([80, 40, 60, 100])
+    tshifts, fshifts, max_mags, _ = batched_fft_caf(signals[0], signals[1:], max_time_shifts, lag_chunk=7)
+
+    for i, max_time_shift in enumerate(max_time_shifts):
+        _, tshift, fshift, max_mag, _ = fft_caf(signals[0], signals[i + 1], max_time_shift)
+        print(i, tshifts[i], tshift, fshifts[i], fshift)
+        assert tshifts[i] == tshift
+        assert fshifts[i] == fshift
+        assert np.isclose(max_mags[i], max_mag)
+
+if __name__ == '__main__':
+    test_batched_fft_caf_matches_pairs()
@@ -1,6 +1,6 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from caf import naive_caf, fft_caf, convolution_caf
+from doa_utils.caf import naive_caf, fft_caf, convolution_caf
 
 def test_caf():
     sig1 = np.random.randn(256) + 1j * np.random.randn(256)
@@ -0,0 +1,43 @@
+import numpy as np
+
+from doa_utils.caf import coarse_to_fine_caf, fft_caf
+from doa_utils.messages import random_bits
+from doa_utils.signal_generator import Emitter, ReceiverArray
+
+def test_coarse_to_fine_caf():
+    sample_rate = 21.80e6
+    positions = [np.array(pos, dtype=float) for pos in
+                 ([0, 0, 0], [1000, 0, 0], [0, 1000, 0], [0, 0, 1000], [800, 800, 100])]
+    emitter = Emitter(1090e6, np.array([3000., -2000, 4000]), np.array([-250., 180, 0]))
+    array = ReceiverArray(sample_rate, 1e-6, positions)
+    signals, tdoa, fdoa = array.receive(emitter.generate_signal(random_bits(2000, rng=5)), emitter,
+                                        return_true_values=True, rng=5)
+    K = signals.shape[1]
+
+    for i in range(1, len(signals)):
+        _, fft_tshift, fft_fshift, _, _ = fft_caf(signals[0], signals[i], 80)
+        tshift, fshift, _ = coarse_to_fine_caf(signals[0], signals[i], 80)
+
+        # the CAF frequency shift is the first receiver's Doppler minus the other's
+        true_fshift = -fdoa[i] / sample_rate
+        print(i, tshift, fft_tshift, tdoa[i] * sample_rate, (fshift - true_fshift) * K, (fft_fshift - true_fshift) * K)
+        assert tshift == fft_tshift
+        assert abs(fshift - true_fshift) < 1 / K
+
+def test_coarse_to_fine_freq_window():
+    K = 8192
+    base = np.random.randn(K) + 1j * np.random.randn(K)
+    # a strong copy far outside the window and a weaker one inside it
+    sig2 = np.roll(base, 6) * np.exp(-2j * np.pi * .05 * np.arange(K)) + \
+           .5 * np.roll(base, -3) * np.exp(-2j * np.pi * .002 * np.arange(K))
+
+    tshift, fshift, _ = coarse_to_fine_caf(base, sig2, 20)
+    assert tshift == 6 and abs(fshift - .05) < 1 / K
+
+    tshift, fshift, _ = coarse_to_fine_caf(base, sig2, 20, max_freq_shift=.01)
+    print(tshift, fshift)
+    assert tshift == -3 and abs(fshift - .002) < 1 / K
+
+if __name__ == '__main__':
+    test_coarse_to_fine_caf()
+    test_coarse_to_fine_freq_window()
@@ -0,0 +1,83 @@
+import numpy as np
+
+from doa_utils.detection import detect_bursts, gated_caf
+from doa_utils.signal_generator import Emitter, Receiver
+
+def burst_capture(num_bursts=3, message_bits=200, gap_bits=2000):
+    # messages separated by silence, a zero symbol samples to zero amplitude
+    emitter = Emitter(1090e6, np.array([3000., -2000, 4000]), np.array([100., 50, 0]))
+    symbols = []
+    message_starts = []
+    for _ in range(num_bursts):
+        symbols += [0] * gap_bits
+        message_starts.append(len(symbols))
+        symbols += emitter.generate_signal(''.join(np.random.choice(['0', '1'], message_bits)))
+    symbols += [0] * gap_bits
+    return emitter, symbols, np.array(message_starts)
+
+def test_detect_bursts():
+    sample_rate = 21.80e6
+    samples_per_bit = int(sample_rate * 1e-6)
+    emitter, symbols, message_starts = burst_capture()
+    receiver = Receiver(sample_rate, 1e-6, np.array([0., 0, 0]))
+    signal, delay, _ = receiver.receive(symbols, emitter, return_true_values=True)
+
+    burst_length = (len(emitter.preamble) + 200) * samples_per_bit
+    starts = detect_bursts(signal, samples_per_bit, min_separation=burst_length)
+    expected = message_starts * samples_per_bit + delay * sample_rate
+    print(starts, expected)
+    assert len(starts) == len(message_starts)
+    assert np.all(np.abs(starts - expected) <= 1)
+
+def test_detect_bursts_in_silence():
+    # without noise, the silent windows only hold FFT round-off and must not score
+    sample_rate = 21.80e6
+    samples_per_bit = int(sample_rate * 1e-6)
+    emitter = Emitter(1090e6, np.array([3000., -2000, 4000]), np.array([100., 50, 0]))
+    receiver = Receiver(sample_rate, 1e-6, np.array([0., 0, 0]))
+    burst = receiver.sample_signal(emitter.generate_signal(''.join(np.random.choice(['0', '1'], 200))))
+
+    start = 10573
+    signal = np.zeros(2 * start + len(burst), dtype=complex)
+    signal[start:start + len(burst)] = np.exp(1j * .3) * burst
+
+    starts = detect_bursts(signal, samples_per_bit, min_separation=len(burst))
+    print(starts)
+    assert np.array_equal(starts, [start])
+
+def test_detect_ppm_bursts():
+    sample_rate = 21.80e6
+    samples_per_bit = int(sample_rate * 1e-6)
+    emitter = Emitter(1090e6, np.array([3000., -2000, 4000]), np.array([100., 50, 0]))
+    receiver = Receiver(sample_rate, 1e-6, np.array([0., 0, 0]), modulation='ppm')
+    burst = receiver.sample_signal(emitter.generate_signal(''.join(np.random.choice(['0', '1'], 200))))
+
+    start = 10573
+    signal = .05 * (np.random.randn(2 * start + len(burst)) + 1j * np.random.randn(2 * start + len(burst)))
+    signal[start:start + len(burst)] += np.exp(1j * .3) * burst
+
+    starts = detect_bursts(signal, samples_per_bit, min_separation=len(burst), modulation='ppm')
+    print(starts)
+    assert np.array_equal(starts, [start])
+
+def test_gated_caf():
+    sample_rate = 21.80e6
+    samples_per_bit = int(sample_rate * 1e-6)
+    emitter, symbols, message_starts = burst_capture()
+    receivers = [Receiver(sample_rate, 1e-6, np.array(pos, dtype=float))
+                 for pos in ([0, 0, 0], [1000, 0, 0], [0, 1000, 0], [0, 0, 1000])]
+    received = [receiver.receive(symbols, emitter, return_true_values=True) for receiver in receivers]
+    true_shifts = np.array([r[1] - received[0][1] for r in received[1:]]) * sample_rate
+
+    burst_length = (len(emitter.preamble) + 200) * samples_per_bit
+    starts, time_shifts, _, _ = gated_caf(received[0][0], np.array([r[0] for r in received[1:]]), 80,
+                                          samples_per_bit, burst_length)
+    print(starts, time_shifts, true_shifts)
+    assert len(starts) == len(message_starts)
+    assert np.all(np.abs(time_shifts - true_shifts) <= 1)
+
+if __name__ == '__main__':
+    test_detect_bursts()
+    test_detect_bursts_in_silence()
+    test_detect_ppm_bursts()
+    test_gated_caf()
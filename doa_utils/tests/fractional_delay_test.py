@@ -0,0 +1,71 @@
+import numpy as np
+
+from doa_utils.signal_generator import (Emitter, Receiver, ReceiverArray, fft_fractional_delay,
+                                        fractional_delay_bank, fractional_delay_taps)
+
+def test_fft_fractional_delay():
+    K = 20000
+    n = np.arange(K)
+    freqs = np.random.uniform(0, .1, 5)
+    phases = np.random.uniform(0, 2 * np.pi, 5)
+    tone = lambda t: np.sum(np.cos(2 * np.pi * freqs[:, None] * t + phases[:, None]), axis=0)
+
+    delays = np.array([0.3, 17.25, 300.7])
+    delayed = fft_fractional_delay(np.broadcast_to(tone(n), (len(delays), K)), delays)
+    for row, delay in zip(delayed, delays):
+        # away from the edges where the capture is cut off
+        inner = slice(int(delay) + 2000, K - 2000)
+        error = np.max(np.abs(row[inner] - tone(n[inner] - delay)))
+        print(delay, error)
+        assert error < 1e-3
+        # nothing has arrived yet before the delay
+        assert np.all(np.abs(row[:max(int(delay) - 64, 0)]) < 1e-2)
+
+def test_fft_delay_method():
+    emitter = Emitter(1090e6, np.array([3000., -2000, 4000]), np.array([200., 150, 0]))
+    positions = [np.array(pos, dtype=float) for pos in ([0, 0, 0], [1000, 0, 0], [0, 1000, 0], [0, 0, 1000])]
+    signal = Receiver(21.80e6, 1e-6, positions[0]).sample_signal(emitter.generate_signal('0110' * 100))
+
+    for dtype in (np.complex128, np.complex64):
+        array = ReceiverArray(21.80e6, 1e-6, positions, dtype=dtype, delay_method='fft')
+        delayed, delays = array.add_time_delay(signal, emitter)
+        assert delayed.dtype == dtype
+        for row, receiver, delay in zip(delayed, array.receivers, delays):
+            expected, expected_delay = receiver.add_time_delay(signal, emitter)
+            assert delay == expected_delay
+            # the batch pads to the longest delay, so only the tails that wrap differ
+            assert np.allclose(row, expected, atol=1e-3)
+
+def exact_taps(fractional_delay, taps=100):
+    n = np.arange(taps)
+    h = np.sinc(n - (taps - 1) / 2 - fractional_delay) * np.blackman(taps)
+    return h / np.sum(h)
+
+def test_fractional_delay_bank():
+    resolution = 1024
+    assert fractional_delay_bank(100, resolution) is fractional_delay_bank(100, resolution)
+    assert fractional_delay_bank(100, resolution).shape == (resolution + 1, 100)
+
+    # a tone at the highest frequency the BPSK waveform has much energy at
+    freq = .05
+    n = np.arange(4000)
+    tone = np.cos(2 * np.pi * freq * n)
+    # delaying by an error e moves the tone by at most 2 pi freq e
+    bound = 2 * np.pi * freq * .5 / resolution
+
+    for fractional_delay in np.random.uniform(0, 1, 50):
+        quantized = np.rint(fractional_delay * resolution) / resolution
+        assert abs(quantized - fractional_delay) <= .5 / resolution
+        assert np.allclose(fractional_delay_taps(fractional_delay, resolution=resolution), exact_taps(quantized))
+
+        error = np.max(np.abs(np.convolve(tone, fractional_delay_taps(fractional_delay, resolution=resolution), mode='same')
+                              - np.convolve(tone, exact_taps(fractional_delay), mode='same'))[100:-100])
+        assert error <= bound * 1.01
+
+    taps = fractional_delay_taps(np.array([.1, .5, .9]), dtype=np.float32)
+    assert taps.shape == (3, 100) and taps.dtype == np.float32
+
+if __name__ == '__main__':
+    test_fft_fractional_delay()
+    test_fft_delay_method()
+    test_fractional_delay_bank()
@@ -0,0 +1,37 @@
+import numpy as np
+
+from doa_utils.caf import gcc
+from doa_utils.signal_generator import Emitter, Receiver
+
+def test_gcc_integer_delays():
+    K = 4000
+    base = np.random.randn(K) + 1j * np.random.randn(K)
+    delays = [0, 5, -7, 12]
+    sigs = np.array([np.roll(base, d) for d in delays]) + .3 * np.random.randn(len(delays), K)
+
+    for weighting in ('plain', 'phat', 'scot'):
+        pairs, time_shifts, _ = gcc(sigs, 20, weighting=weighting)
+        print(weighting, time_shifts)
+        for (i, j), time_shift in zip(pairs, time_shifts):
+            assert abs(time_shift - (delays[j] - delays[i])) < .1
+
+def test_gcc_fractional_delays():
+    sample_rate = 21.80e6
+    emitter = Emitter(1090e6, np.array([1000., 2000, 3000]), np.array([0, -7., 0]))
+    receivers = [Receiver(sample_rate, 1e-6, np.array(pos, dtype=float))
+                 for pos in ([0, 0, 0], [1000, 0, 0], [0, 1000, 0], [0, 0, 1000])]
+    message = ''.join(np.random.choice(['0', '1'], 2000))
+    symbols = emitter.generate_signal(message)
+
+    received = [receiver.receive(symbols, emitter, return_true_values=True) for receiver in receivers]
+    sigs = np.array([r[0] for r in received])
+    true_shifts = np.array([r[1] - received[0][1] for r in received[1:]]) * sample_rate
+
+    for weighting in ('plain', 'phat', 'scot'):
+        _, time_shifts, _ = gcc(sigs, 80, pairs=[(0, 1), (0, 2), (0, 3)], weighting=weighting)
+        print(weighting, time_shifts, true_shifts)
+        assert np.all(np.abs(time_shifts - true_shifts) < .25)
+
+if __name__ == '__main__':
+    test_gcc_integer_delays()
+    test_gcc_fractional_delays()
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from doa_utils.messages import crc24, df17_frames, frames_to_hex, hex_to_frames, random_bits
+from doa_utils.signal_generator import Emitter
+
+def test_crc():
+    # a captured DF17 frame, its last 24 bits are the parity of the first 88
+    frame = hex_to_frames(['8D4840D6202CC371C32CE0576098'])
+    assert np.array_equal(crc24(frame[:, :88]), frame[:, 88:])
+    # the parity of a whole valid frame is zero
+    assert not np.any(crc24(frame))
+
+def test_df17_frames_decode():
+    pms = pytest.importorskip('pyModeS')
+    icao = np.random.randint(0, 1 << 24, 50)
+    frames = df17_frames(50, icao=icao)
+    assert frames.shape == (50, 112) and frames.dtype == np.uint8
+
+    for address, message in zip(icao, frames_to_hex(frames)):
+        if hasattr(pms, 'crc'): # pyModeS 2, as recv_hex.py uses it
+            assert pms.df(message) == 17
+            assert pms.crc(message) == 0
+            assert pms.icao(message) == f'{address:06X}'
+        else:
+            decoded = pms.decode(message)
+            assert decoded['df'] == 17
+            assert decoded['crc_valid']
+            assert decoded['icao'] == f'{address:06X}'
+
+def test_generate_signal_arrays():
+    emitter = Emitter(1090e6, np.zeros(3), np.zeros(3))
+    bits = random_bits(112, 8)
+    batch = emitter.generate_signal(bits)
+    assert batch.shape == (8, len(emitter.preamble) + 112)
+
+    # same symbols as the string path
+    for row, symbols in zip(bits, batch):
+        assert np.array_equal(symbols, emitter.generate_signal(''.join(map(str, row))))
+
+if __name__ == '__main__':
+    test_crc()
+    test_df17_frames_decode()
+    test_generate_signal_arrays()
@@ -0,0 +1,55 @@
+import numpy as np
+
+from doa_utils.caf import multi_burst_caf
+from doa_utils.detection import detect_bursts
+from doa_utils.signal_generator import Emitter, Receiver
+
+def test_multi_burst_caf():
+    sample_rate = 21.80e6
+    samples_per_bit = int(sample_rate * 1e-6)
+    emitter = Emitter(1090e6, np.array([3000., -2000, 4000]), np.array([200., 150, 0]))
+
+    # six 112 bit squitters with jittered gaps of silence in one capture
+    symbols = []
+    for _ in range(6):
+        symbols += [0] * np.random.randint(300, 1200)
+        symbols += emitter.generate_signal(''.join(np.random.choice(['0', '1'], 112)))
+    symbols += [0] * 300
+
+    receivers = [Receiver(sample_rate, 1e-6, np.array(pos, dtype=float)) for pos in ([0, 0, 0], [1000, 0, 0])]
+    (sig1, _, f1), (sig2, _, f2) = [receiver.receive(symbols, emitter, return_true_values=True) for receiver in receivers]
+    true_freq_shift = (f1 - f2) / sample_rate
+
+    max_time_shift = 60
+    max_freq_shift = 2 * 350 / 299792458.0 * 1090e6 / sample_rate
+    burst_length = (len(emitter.preamble) + 112) * samples_per_bit
+    starts = detect_bursts(sig1, samples_per_bit, min_separation=burst_length)
+    windows = [slice(start - max_time_shift, start + burst_length + max_time_shift) for start in starts]
+    time_tags = [window.start for window in windows]
+    assert len(windows) == 6
+
+    errors = {'coherent': [], 'non-coherent': [], 'single burst': []}
+    for _ in range(10):
+        # extra noise so a single burst gives a poor frequency estimate
+        noise = lambda n: 3 * (np.random.randn(n) + 1j * np.random.randn(n))
+        bursts1 = [sig1[w] + noise(w.stop - w.start) for w in windows]
+        bursts2 = [sig2[w] + noise(w.stop - w.start) for w in windows]
+
+        caf_out, _, freq_shift, _, _ = multi_burst_caf(bursts1, bursts2, time_tags, max_time_shift, max_freq_shift)
+        num_freqs = len(caf_out)
+        errors['coherent'].append(freq_shift - true_freq_shift)
+
+        freq_shift = multi_burst_caf(bursts1, bursts2, time_tags, max_time_shift, max_freq_shift,
+                                     num_freqs=num_freqs, coherent=False)[2]
+        errors['non-coherent'].append(freq_shift - true_freq_shift)
+
+        freq_shift = multi_burst_caf(bursts1[:1], bursts2[:1], time_tags[:1], max_time_shift, max_freq_shift,
+                                     num_freqs=num_freqs)[2]
+        errors['single burst'].append(freq_shift - true_freq_shift)
+
+    rms = {key: np.sqrt(np.mean(np.square(value))) for key, value in errors.items()}
+    print(rms)
+    assert rms['coherent'] < rms['non-coherent'] < rms['single burst']
+
+if __name__ == '__main__':
+    test_multi_burst_caf()
@@ -0,0 +1,46 @@
+import random
+import numpy as np
+
+from doa_utils.signal_generator import Emitter, Receiver
+from doa_utils.caf import fft_caf_peaks, refine_caf_peak
+
+def test_peak_interpolation():
+    sample_rate = 21.80e6
+    emitter = Emitter(1090e6, np.array([0, 0, 0]), np.array([250, 0, 0]))
+    errors = {'integer': [], 'parabolic': [], 'phase': []}
+
+    for trial in range(5):
+        receivers = [Receiver(sample_rate, 1e-6, np.array([1000 + 37 * trial, 900, 700])),
+                     Receiver(sample_rate, 1e-6, np.array([-500, 0, 0]))]
+        message = ''.join([random.choice('01') for _ in range(1000)])
+        symbols = emitter.generate_signal(message)
+        (sig1, t1, f1), (sig2, t2, f2) = [receiver.receive(symbols, emitter, return_true_values=True) for receiver in receivers]
+
+        true_tdoa = (t2 - t1) * sample_rate
+        true_fdoa = (f1 - f2) / sample_rate
+
+        tshift, fshift, _, _, _ = fft_caf_peaks(sig1, sig2, 150)
+        errors['integer'].append((tshift - true_tdoa, (fshift - true_fdoa) * sample_rate))
+        for method in ['parabolic', 'phase']:
+            refined_tshift, refined_fshift = refine_caf_peak(sig1, sig2, tshift, fshift, method)
+            errors[method].append((refined_tshift - true_tdoa, (refined_fshift - true_fdoa) * sample_rate))
+
+    rms = {method: np.sqrt(np.mean(np.square(errs), axis=0)) for method, errs in errors.items()}
+    for method, (tdoa_rms, fdoa_rms) in rms.items():
+        print(f"{method}: TDOA RMS error {tdoa_rms} samples, FDOA RMS error {fdoa_rms} Hz")
+
+    assert rms['parabolic'][0] < rms['integer'][0]
+    assert rms['phase'][0] < rms['integer'][0]
+    assert rms['phase'][1] < rms['integer'][1]
+
+def test_unknown_method():
+    sig = np.random.randn(64) + 1j * np.random.randn(64)
+    try:
+        refine_caf_peak(sig, sig, 0, 0.0, 'cubic')
+        assert False, "Expected a ValueError"
+    except ValueError:
+        pass
+
+if __name__ == '__main__':
+    test_peak_interpolation()
+    test_unknown_method()
@@ -0,0 +1,51 @@
+import random
+import numpy as np
+
+from doa_utils.signal_generator import Emitter, Receiver
+from doa_utils.caf import fft_caf, convolution_caf
+
+def receive_pair(dtype, message, seed):
+    emitter = Emitter(1090e6, np.array([0, 0, 0]), np.array([250, 0, 0]))
+    receivers = [Receiver(21.80e6, 1e-6, np.array([1000, 900, 700]), dtype=dtype),
+                 Receiver(21.80e6, 1e-6, np.array([-500, 0, 0]), dtype=dtype)]
+
+    symbols = emitter.generate_signal(message)
+    # same noise realisation for both precisions
+    np.random.seed(seed)
+    received = [receiver.receive(symbols, emitter, return_true_values=True) for receiver in receivers]
+    signals, tshifts, fshifts = zip(*received)
+    true_tdoa = (tshifts[1] - tshifts[0]) * receivers[0].sample_rate
+    true_fdoa = (fshifts[0] - fshifts[1]) / receivers[0].sample_rate
+    return signals, true_tdoa, true_fdoa
+
+def test_single_precision():
+    message = ''.join([random.choice('01') for _ in range(2000)])
+    double_sigs, true_tdoa, true_fdoa = receive_pair(np.complex128, message, 1)
+    single_sigs, _, _ = receive_pair(np.complex64, message, 1)
+    K = len(double_sigs[0])
+
+    for sig in single_sigs:
+        assert sig.dtype == np.complex64
+
+    double_out = fft_caf(double_sigs[0], double_sigs[1], 150)
+    single_out = fft_caf(single_sigs[0], single_sigs[1], 150)
+    assert single_out[0].dtype == np.complex64
+
+    print(f"True TDOA: {true_tdoa} FDOA: {true_fdoa}")
+    print(f"Double TDOA: {double_out[1]} FDOA: {double_out[2]}")
+    print(f"Single TDOA: {single_out[1]} FDOA: {single_out[2]}")
+    assert abs(double_out[1] - true_tdoa) <= 1
+    assert abs(double_out[2] - true_fdoa) <= 1 / K
+    assert single_out[1] == double_out[1]
+    assert single_out[2] == double_out[2]
+    assert np.isclose(single_out[3], double_out[3], rtol=1e-3)
+
+    double_out = convolution_caf(double_sigs[0], double_sigs[1], 11, max_time_shift=150)
+    single_out = convolution_caf(single_sigs[0], single_sigs[1], 11, max_time_shift=150)
+    assert single_out[1:3] == double_out[1:3]
+
+    # an explicit dtype overrides the precision of the inputs
+    assert fft_caf(double_sigs[0], double_sigs[1], 10, dtype=np.complex64)[0].dtype == np.complex64
+
+if __name__ == '__main__':
+    test_single_precision()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+import numpy as np
+
+from doa_utils.caf import fft_caf, read_iq_blocks, streaming_caf, write_iq_blocks
+from doa_utils.signal_generator import Emitter, Receiver, ReceiverArray
+
+def noiseless(receiver):
+    receiver.add_noise = lambda signal, emitter, signal_power=None, rng=None: signal
+    return receiver
+
+def test_receive_blocks_matches_receive():
+    emitter = Emitter(1090e6, np.array([3000., -2000, 4000]), np.array([200., 150, 0]))
+    symbols = emitter.generate_signal(''.join(np.random.choice(['0', '1'], 500)))
+
+    # far enough for a long integer delay, and closer than the filter half length
+    for position in ([0, 0, 0], [3000, -2000, 3950]):
+        for dtype in (np.complex128, np.complex64):
+            receiver = noiseless(Receiver(21.80e6, 1e-6, np.array(position, dtype=float), dtype=dtype))
+            expected = receiver.receive(symbols, emitter)
+            for block_size in (1000, 4096, 50000):
+                blocks = list(receiver.receive_blocks(symbols, emitter, block_size))
+                assert all(len(block) == block_size for block in blocks[:-1])
+                assert blocks[0].dtype == dtype
+                assert np.allclose(np.concatenate(blocks), expected, atol=1e-5)
+
+def test_receiver_array_blocks():
+    emitter = Emitter(1090e6, np.array([3000., -2000, 4000]), np.array([200., 150, 0]))
+    positions = [np.array(pos, dtype=float) for pos in ([0, 0, 0], [1000, 0, 0], [0, 1000, 0])]
+    symbols = emitter.generate_signal(''.join(np.random.choice(['0', '1'], 500)))
+
+    array = ReceiverArray(21.80e6, 1e-6, positions)
+    blocks = list(array.receive_blocks(symbols, emitter, 4096))
+    assert blocks[0].shape == (3, 4096)
+    assert sum(block.shape[1] for block in blocks) == len(symbols) * 21
+
+    # the blocks feed the streaming CAF directly, through a recording as well
+    sig1 = np.concatenate([block[0] for block in blocks])
+    sig2 = np.concatenate([block[1] for block in blocks])
+    expected_time_shift = fft_caf(sig1, sig2, 80)[1]
+    time_shift = streaming_caf((block[0] for block in blocks), (block[1] for block in blocks), 80)[1]
+    assert time_shift == expected_time_shift
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, f'recv{i}.txt') for i in range(2)]
+        for i, path in enumerate(paths):
+            # scaled down so the samples fit SC16 Q11
+            assert write_iq_blocks(path, (block[i] / 4 for block in blocks)) == len(sig1)
+        time_shift = streaming_caf(read_iq_blocks(paths[0]), read_iq_blocks(paths[1]), 80)[1]
+        assert time_shift == expected_time_shift
+
+if __name__ == '__main__':
+    test_receive_blocks_matches_receive()
+    test_receiver_array_blocks()
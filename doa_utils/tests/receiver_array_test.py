@@ -0,0 +1,27 @@
+import numpy as np
+
+from doa_utils.signal_generator import Emitter, Receiver, ReceiverArray
+
+def test_receiver_array_matches_receivers():
+    emitter = Emitter(1090e6, np.array([3000., -2000, 4000]), np.array([200., 150, 0]))
+    positions = [np.array(pos, dtype=float) for pos in
+                 ([0, 0, 0], [1000, 0, 0], [0, 1000, 0], [0, 0, 1000], [800, 800, 100])]
+    symbols = emitter.generate_signal(''.join(np.random.choice(['0', '1'], 500)))
+
+    for dtype, tol in ((np.complex128, 1e-12), (np.complex64, 1e-5)):
+        # same seed, so the batched noise must be the same draws as the loop
+        np.random.seed(1)
+        received = [Receiver(21.80e6, 1e-6, pos, dtype=dtype).receive(symbols, emitter, return_true_values=True)
+                    for pos in positions]
+        np.random.seed(1)
+        signals, tdoa, fdoa = ReceiverArray(21.80e6, 1e-6, positions, dtype=dtype).receive(symbols, emitter,
+                                                                                            return_true_values=True)
+
+        assert signals.shape == (len(positions), len(received[0][0]))
+        assert signals.dtype == dtype
+        assert np.max(np.abs(signals - np.array([r[0] for r in received]))) < tol
+        assert np.allclose(tdoa, [r[1] - received[0][1] for r in received], rtol=0, atol=1e-15)
+        assert np.allclose(fdoa, [r[2] - received[0][2] for r in received], rtol=0, atol=1e-9)
+
+if __name__ == '__main__':
+    test_receiver_array_matches_receivers()
@@ -0,0 +1,59 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+from doa_utils.messages import df17_frames
+from doa_utils.rng import spawn
+from doa_utils.signal_generator import Emitter, Receiver, ReceiverArray
+from doa_utils.simulator import simulate_doa
+
+receiver_positions = [np.array(pos, dtype=float) for pos in
+                      ([0, 0, 0], [1000, 0, 0], [0, 1000, 0], [0, 0, 1000], [800, 800, 100])]
+
+def test_receiver_streams():
+    emitter = Emitter(1090e6, np.array([3000., -2000, 4000]), np.array([200., 150, 0]))
+    symbols = emitter.generate_signal(df17_frames(rng=7))
+    array = ReceiverArray(21.80e6, 1e-6, receiver_positions)
+
+    signals = array.receive(symbols, emitter, rng=1)
+    assert np.array_equal(signals, array.receive(symbols, emitter, rng=1))
+    assert not np.array_equal(signals, array.receive(symbols, emitter, rng=2))
+
+    # every receiver draws from its own spawned stream
+    streams = spawn(1, len(receiver_positions))
+    for row, (pos, stream) in enumerate(zip(receiver_positions, streams)):
+        received = Receiver(21.80e6, 1e-6, pos).receive(symbols, emitter, rng=stream)
+        assert np.allclose(signals[row], received, rtol=0, atol=1e-12)
+
+def trial(rng):
+    # module level so process pools can pickle it
+    return simulate_doa(np.array([1000., 2000, 3000]), np.array([0, -70., 0]), receiver_positions, rng=rng)
+
+def test_parallel_trials():
+    # the global state isn't involved, so trials in threads match running them in turn
+    sequential = [trial(rng) for rng in spawn(123, 3)]
+    with ThreadPoolExecutor(3) as pool:
+        parallel = list(pool.map(trial, spawn(123, 3)))
+
+    for expected, result in zip(sequential, parallel):
+        for a, b in zip(expected, result):
+            assert np.array_equal(a, b)
+
+def test_process_pool_trials():
+    # spawned Generators and SeedSequences are pickled into the workers and
+    # still give the same trials as running them in turn
+    for streams in (lambda: spawn(123, 3), lambda: np.random.SeedSequence(123).spawn(3)):
+        sequential = [trial(rng) for rng in streams()]
+        with ProcessPoolExecutor(2) as pool:
+            parallel = list(pool.map(trial, streams()))
+
+        for expected, result in zip(sequential, parallel):
+            for a, b in zip(expected, result):
+                assert np.array_equal(a, b)
+
+if __name__ == '__main__':
+    test_receiver_streams()
+    test_parallel_trials()
+    test_process_pool_trials()
@@ -0,0 +1,41 @@
+import numpy as np
+
+from doa_utils.signal_generator import Emitter, Receiver
+
+def looped_sample_signal(symbols, samples_per_bit, ppm):
+    # the original per symbol construction
+    signal = np.array([])
+    half_samples = int(samples_per_bit / 2)
+    for sym in symbols:
+        if not ppm:
+            bit = np.ones(samples_per_bit) * sym
+        elif sym == 1:
+            bit = np.append(np.ones(half_samples), np.zeros(samples_per_bit - half_samples))
+        else:
+            bit = np.append(np.zeros(half_samples), np.ones(samples_per_bit - half_samples))
+        signal = np.append(signal, bit)
+    return signal
+
+def test_sample_signal():
+    emitter = Emitter(1090e6, np.zeros(3), np.zeros(3))
+    symbols = emitter.generate_signal(''.join(np.random.choice(['0', '1'], 200)))
+
+    for modulation in ('bpsk', 'ppm'):
+        receiver = Receiver(21.80e6, 1e-6, np.zeros(3), modulation=modulation)
+        expected = looped_sample_signal(symbols, 21, modulation == 'ppm')
+        assert np.array_equal(receiver.sample_signal(symbols), expected)
+
+def test_sample_signal_batch():
+    emitter = Emitter(1090e6, np.zeros(3), np.zeros(3))
+    batch = np.array([emitter.generate_signal(''.join(np.random.choice(['0', '1'], 112))) for _ in range(8)])
+
+    for modulation in ('bpsk', 'ppm'):
+        receiver = Receiver(21.80e6, 1e-6, np.zeros(3), modulation=modulation)
+        samples = receiver.sample_signal(batch)
+        assert samples.shape == (8, batch.shape[1] * 21)
+        for row, symbols in zip(samples, batch):
+            assert np.array_equal(row, receiver.sample_signal(symbols))
+
+if __name__ == '__main__':
+    test_sample_signal()
+    test_sample_signal_batch()
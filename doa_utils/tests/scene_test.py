@@ -0,0 +1,97 @@
+import numpy as np
+
+from doa_utils.detection import detect_bursts
+from doa_utils.rng import spawn
+from doa_utils.scene import TrafficScene
+from doa_utils.signal_generator import Emitter, ReceiverArray
+
+receiver_positions = [np.array(pos, dtype=float) for pos in ([0, 0, 0], [1000, 0, 0], [0, 1000, 0], [0, 0, 1000])]
+
+def random_bits(n):
+    return ''.join(np.random.choice(['0', '1'], n))
+
+def test_single_message_matches_receiver_array():
+    position, velocity = np.array([3000., -2000, 4000]), np.array([200., 150, 0])
+    scene = TrafficScene(21.80e6, 1e-6, receiver_positions, position[None], velocity[None])
+    bits = random_bits(500)
+    scene.schedule([0], [0.0], [bits])
+    K = (15 + 500) * 21
+    signals = scene.render(0, K, noise=False)
+
+    array = ReceiverArray(21.80e6, 1e-6, receiver_positions)
+    array.add_noise = lambda signals, emitter, rng=None: signals
+    emitter = Emitter(1090e6, position, velocity)
+    expected = array.receive(emitter.generate_signal(bits), emitter)
+
+    # the scene also keeps the filter's pre-ringing just before the arrival
+    for row, expected_row, delay in zip(signals, expected, (scene.delays[0] * 21.80e6).astype(int)):
+        keep = np.ones(K, dtype=bool)
+        keep[max(delay - 49, 0):delay] = False
+        assert np.allclose(row[keep], expected_row[keep], atol=1e-12)
+
+def test_superposition_and_blocks():
+    num_emitters = 20
+    positions = np.random.uniform(-30000, 30000, (num_emitters, 3))
+    velocities = np.random.normal(0, 150, (num_emitters, 3))
+    scene = TrafficScene(21.80e6, 1e-6, receiver_positions, positions, velocities)
+
+    emitters = np.random.randint(0, num_emitters, 60)
+    times = np.random.uniform(0, 5e-3, 60)
+    messages = [random_bits(112) for _ in range(60)]
+    scene.schedule(emitters, times, messages)
+    signals = scene.render(0, 120000, noise=False)
+
+    # the sum of every message rendered on its own
+    total = np.zeros_like(signals)
+    for e, t, bits in zip(emitters, times, messages):
+        single = TrafficScene(21.80e6, 1e-6, receiver_positions, positions, velocities)
+        single.schedule([e], [t], [bits])
+        total += single.render(0, 120000, noise=False)
+    assert np.allclose(signals, total, atol=1e-9)
+
+    # blocks shorter than a message only render the part of it they cover
+    for block_size in (7000, 333):
+        blocks = list(scene.render_blocks(120000, block_size, noise=False))
+        assert np.allclose(np.concatenate(blocks, axis=1), signals, atol=1e-9)
+
+def test_detect_scene_messages():
+    num_emitters = 10
+    positions = np.random.uniform(-30000, 30000, (num_emitters, 3))
+    velocities = np.random.normal(0, 150, (num_emitters, 3))
+    scene = TrafficScene(21.80e6, 1e-6, receiver_positions, positions, velocities)
+
+    # one message per emitter, far enough apart not to overlap
+    times = np.arange(num_emitters) * 500e-6
+    scene.schedule(np.arange(num_emitters), times, [random_bits(112) for _ in range(num_emitters)])
+    signals = scene.render(0, int(times[-1] * 21.80e6) + 10000)
+
+    starts = detect_bursts(signals[0], 21, min_separation=127 * 21)
+    expected = (times + scene.delays[:, 0]) * 21.80e6
+    print(starts, expected)
+    assert len(starts) == num_emitters
+    assert np.all(np.abs(starts - expected) <= 1)
+
+def test_noise_streams():
+    position, velocity = np.array([3000., -2000, 4000]), np.array([200., 150, 0])
+    scene = TrafficScene(21.80e6, 1e-6, receiver_positions, position[None], velocity[None], rng=7)
+    bits = random_bits(112)
+    scene.schedule([0], [0.0], [bits])
+    clean = scene.render(0, 5000, noise=False)
+    signals = scene.render(0, 5000)
+
+    # every receiver draws from its own stream spawned from the seed
+    for row, clean_row, stream in zip(signals, clean, spawn(7, len(receiver_positions))):
+        draws = stream.standard_normal((5000, 2))
+        assert np.allclose(row, clean_row + scene.noise_std * (draws[:, 0] + 1j * draws[:, 1]))
+
+    # the same seed reproduces the capture, rendered at once or in blocks
+    again = TrafficScene(21.80e6, 1e-6, receiver_positions, position[None], velocity[None], rng=7)
+    again.schedule([0], [0.0], [bits])
+    blocks = list(again.render_blocks(5000, 700))
+    assert np.allclose(np.concatenate(blocks, axis=1), signals)
+
+if __name__ == '__main__':
+    test_single_message_matches_receiver_array()
+    test_superposition_and_blocks()
+    test_detect_scene_messages()
+    test_noise_streams()
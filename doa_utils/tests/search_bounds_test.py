@@ -0,0 +1,32 @@
+import numpy as np
+
+from doa_utils.signal_generator import Emitter, Receiver
+from doa_utils.simulator import caf_search_bounds
+
+def test_search_bounds():
+    sample_rate = 21.80e6
+    speed = 300
+
+    for _ in range(20):
+        receiver_positions = np.random.uniform(-2000, 2000, (5, 3))
+        emitter_velocity = np.random.randn(3)
+        emitter_velocity *= speed / np.linalg.norm(emitter_velocity)
+        emitter = Emitter(1090e6, np.random.uniform(-20000, 20000, 3), emitter_velocity)
+        receivers = [Receiver(sample_rate, 1e-6, pos) for pos in receiver_positions]
+
+        max_time_shifts, max_freq_shifts = caf_search_bounds(receiver_positions, sample_rate, speed)
+
+        signal = np.ones(10)
+        delays = [receiver.add_time_delay(signal, emitter)[1] for receiver in receivers]
+        dopplers = [receiver.apply_doppler(signal, emitter)[1] for receiver in receivers]
+        for i in range(1, len(receivers)):
+            assert abs(delays[i] - delays[0]) * sample_rate <= max_time_shifts[i - 1]
+            assert abs(dopplers[i] - dopplers[0]) / sample_rate <= max_freq_shifts[i - 1]
+
+    # closely spaced receivers only need a handful of lags
+    max_time_shifts, _ = caf_search_bounds([np.zeros(3), np.array([100, 0, 0])], sample_rate, speed)
+    print(max_time_shifts)
+    assert max_time_shifts[0] <= 10
+
+if __name__ == '__main__':
+    test_search_bounds()
@@ -0,0 +1,45 @@
+import time
+
+import numpy as np
+
+from doa_utils.caf import fft_caf, separable_caf
+from doa_utils.signal_generator import Emitter, Receiver
+
+def simulated_pair(sample_rate=21.80e6):
+    emitter_velocity = np.random.randn(3)
+    emitter_velocity *= 250 / np.linalg.norm(emitter_velocity)
+    emitter = Emitter(1090e6, np.random.uniform(-20000, 20000, 3), emitter_velocity)
+    receivers = [Receiver(sample_rate, 1e-6, pos) for pos in np.random.uniform(-1500, 1500, (2, 3))]
+
+    message = ''.join(np.random.choice(['0', '1'], 2000))
+    symbols = emitter.generate_signal(message)
+    return [receiver.receive(symbols, emitter) for receiver in receivers]
+
+def test_separable_matches_fft_caf():
+    max_time_shift = 150
+    for _ in range(5):
+        sig1, sig2 = simulated_pair()
+        _, time_shift, freq_shift, max_mag, _ = fft_caf(sig1, sig2, max_time_shift)
+        sep_time_shift, sep_freq_shift, sep_mag = separable_caf(sig1, sig2, max_time_shift)
+        print(time_shift, freq_shift, sep_time_shift, sep_freq_shift)
+        assert sep_time_shift == time_shift
+        assert sep_freq_shift == freq_shift
+        assert np.isclose(sep_mag, max_mag)
+
+def test_separable_benchmark():
+    max_time_shift = 150
+    sig1, sig2 = simulated_pair()
+
+    start = time.perf_counter()
+    fft_caf(sig1, sig2, max_time_shift)
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    separable_caf(sig1, sig2, max_time_shift)
+    separable_time = time.perf_counter() - start
+
+    print(f"fft_caf: {full_time:.3f} s, separable_caf: {separable_time:.3f} s ({full_time / separable_time:.0f}x)")
+
+if __name__ == '__main__':
+    test_separable_matches_fft_caf()
+    test_separable_benchmark()
@@ -0,0 +1,30 @@
+import numpy as np
+
+from doa_utils.simulator import simulate_doa
+
+# geodetic receivers spread in altitude as well, the way the web app passes them
+lat0, lon0 = 34.0, -117.0
+receiver_positions = np.array([[lat0, lon0, 100], [lat0 + .01, lon0, 400], [lat0, lon0 + .012, 900],
+                               [lat0 - .008, lon0 - .006, 1500], [lat0 + .006, lon0 - .01, 250],
+                               [lat0 - .01, lon0 + .008, 700], [lat0 + .012, lon0 + .01, 1200]])
+emitter_position = np.array([lat0 + .02, lon0 + .015, 3000])
+emitter_velocity = np.array([40., -60, 0]) # east, north, up
+
+def test_geodetic_output():
+    for caf_method, refine_peaks in (('fft', 'phase'), ('fft', None), ('gcc', None)):
+        est_pos, est_vel, true_pos, true_vel = simulate_doa(emitter_position, emitter_velocity, receiver_positions,
+                                                            cartesian=False, caf_method=caf_method,
+                                                            refine_peaks=refine_peaks, rng=4)
+        print(caf_method, refine_peaks, est_pos, est_vel, true_pos, true_vel)
+
+        # latitude, longitude and altitude on the emitter's side of the reference receiver
+        assert np.allclose(true_pos[:2], emitter_position[:2], atol=1e-6)
+        assert abs(true_pos[2] - emitter_position[2]) < 1
+        assert np.allclose(true_vel, emitter_velocity, atol=1e-3)
+        assert np.allclose(est_pos[:2], emitter_position[:2], atol=1e-3)
+        assert abs(est_pos[2] - emitter_position[2]) < 100
+        if refine_peaks is not None:
+            assert np.linalg.norm(est_vel - emitter_velocity) < 2
+
+if __name__ == '__main__':
+    test_geodetic_output()
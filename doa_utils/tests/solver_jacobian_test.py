@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+from scipy.optimize import approx_fprime, least_squares
+
+from doa_utils.signal_generator import Receiver
+from doa_utils.solver import (c, estimate_emitter, f0, fdoa_v_known, fdoa_v_known_jacobian, fdoa_v_unknown,
+                              fdoa_v_unknown_jacobian, fdoa_with_tdoa, fdoa_with_tdoa_jacobian, tdoa, tdoa_jacobian)
+
+receiver_positions = [np.array(pos, dtype=float) for pos in
+                      ([0, 0, 0], [1000, 0, 0], [0, 1000, 0], [0, 0, 1000], [800, 800, 100], [-500, 300, 20],
+                       [200, -900, 50])]
+emitter_position = np.array([1000., 2000, 3000])
+emitter_velocity = np.array([0, -70., 0])
+
+def measurements(pairs=None):
+    distances = np.array([np.linalg.norm(emitter_position - pos) for pos in receiver_positions])
+    radial = np.array([np.dot(emitter_velocity, emitter_position - pos) / np.linalg.norm(emitter_position - pos)
+                       for pos in receiver_positions])
+    if pairs is None:
+        return list(radial * f0 / c), list(distances / c)
+    return [(radial[j] - radial[i]) * f0 / c for i, j in pairs], [(distances[j] - distances[i]) / c for i, j in pairs]
+
+def test_jacobians():
+    # analytic Jacobians match finite differences away from the solution
+    X = emitter_position + [300, -200, 150]
+    V = emitter_velocity + [20, 10, -5]
+    Z = np.concatenate((X, V))
+    pairs = [(i, j) for i in range(len(receiver_positions)) for j in range(i + 1, len(receiver_positions))]
+
+    for p in (None, pairs):
+        fdoa_data, toa_data = measurements(p)
+        cases = [(lambda X: tdoa(X, receiver_positions, toa_data, p), tdoa_jacobian(X, receiver_positions, toa_data, p), X),
+                 (lambda X: fdoa_v_known(X, V, receiver_positions, fdoa_data, p),
+                  fdoa_v_known_jacobian(X, V, receiver_positions, fdoa_data, p), X),
+                 (lambda Z: fdoa_v_unknown(Z, receiver_positions, fdoa_data, p),
+                  fdoa_v_unknown_jacobian(Z, receiver_positions, fdoa_data, p), Z),
+                 (lambda Z: fdoa_with_tdoa(Z, receiver_positions, fdoa_data, toa_data, p),
+                  fdoa_with_tdoa_jacobian(Z, receiver_positions, fdoa_data, toa_data, p), Z)]
+        for objective, jacobian, point in cases:
+            expected = np.array([approx_fprime(point, lambda x: objective(x)[k], 1e-4)
+                                 for k in range(len(objective(point)))])
+            assert jacobian.shape == expected.shape
+            assert np.allclose(jacobian, expected, rtol=1e-4, atol=1e-6)
+
+def test_analytic_jacobian_speedup():
+    receivers = [Receiver(21.80e6, 1e-6, pos) for pos in receiver_positions]
+    fdoa_data, toa_data = measurements()
+    repeats = 20
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        estimate = estimate_emitter(receivers, fdoa_data, toa_data)
+    analytic = time.perf_counter() - start
+    assert np.allclose(estimate, np.concatenate((emitter_position, emitter_velocity)), atol=1e-3)
+
+    # the same problem with finite difference Jacobians
+    x0 = np.concatenate((np.mean(receiver_positions, axis=0), np.zeros(3)))
+    start = time.perf_counter()
+    for _ in range(repeats):
+        least_squares(lambda Z: fdoa_with_tdoa(Z, receiver_positions, fdoa_data, toa_data), x0)
+    finite_differences = time.perf_counter() - start
+    print(f"finite differences: {finite_differences:.3f} s, analytic: {analytic:.3f} s ({finite_differences / analytic:.1f}x)")
+
+if __name__ == '__main__':
+    test_jacobians()
+    test_analytic_jacobian_speedup()
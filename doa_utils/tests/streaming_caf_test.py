@@ -0,0 +1,38 @@
+import numpy as np
+
+from doa_utils.caf import streaming_caf, iter_blocks
+
+def test_streaming_caf():
+    K = 50000
+    segment_length = 2048
+    symbols = np.repeat(np.random.choice([-1, 1], K // 20), 20).astype(complex)
+    freq = 3 / segment_length
+
+    sig1 = symbols + .5 * (np.random.randn(K) + 1j * np.random.randn(K))
+    sig2 = np.roll(symbols, 25) * np.exp(-1j * 2 * np.pi * freq * np.arange(K))
+    sig2 += .5 * (np.random.randn(K) + 1j * np.random.randn(K))
+
+    for coherent in [False, True]:
+        # block sizes deliberately don't line up with the segments
+        caf_out, tshift, fshift, max_mag, median_mag = streaming_caf(iter_blocks(sig1, 1000), iter_blocks(sig2, 3001), 50,
+                                                                     segment_length=segment_length, coherent=coherent)
+        print(tshift, fshift, max_mag, median_mag)
+        assert caf_out.shape == (segment_length, 101)
+        assert tshift == 25
+        assert np.isclose(fshift, freq)
+
+def test_single_segment():
+    sig1 = np.random.randn(512) + 1j * np.random.randn(512)
+    sig2 = np.random.randn(512) + 1j * np.random.randn(512)
+
+    caf_out = streaming_caf([sig1], [sig2], 10, segment_length=512, coherent=True)[0]
+
+    # a single segment is the linear (zero padded) correlation of the capture
+    padded = np.concatenate((np.zeros(10), sig2, np.zeros(10)))
+    for i, tshift in enumerate(range(-10, 11)):
+        shifted = padded[10 + tshift:10 + tshift + 512]
+        assert np.allclose(caf_out[:, i], np.fft.fft(sig1 * shifted.conj()))
+
+if __name__ == '__main__':
+    test_streaming_caf()
+    test_single_segment()
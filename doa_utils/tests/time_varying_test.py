@@ -0,0 +1,54 @@
+import numpy as np
+
+from doa_utils.signal_generator import (MAX_PHASE_ERROR, Emitter, ReceiverArray, moving_emitter_channel,
+                                        propagation_delays)
+
+sample_rate = 21.80e6
+receiver_positions = [np.array(pos, dtype=float) for pos in
+                      ([0, 0, 0], [30000, 0, 0], [0, 30000, 0], [0, 0, 1000])]
+
+def test_static_emitter():
+    # without motion the channel is the fixed geometry one
+    emitter = Emitter(1090e6, np.array([10000., 20000, 9000]), np.zeros(3))
+    array = ReceiverArray(sample_rate, 1e-6, receiver_positions)
+    signal = np.random.randn(20000)
+
+    expected, delays = array.add_time_delay(signal, emitter)
+    signals, t, f = moving_emitter_channel(signal, emitter, array.positions, sample_rate)
+    assert np.allclose(t, delays)
+    assert np.allclose(f, 0)
+    # the fixed geometry path cuts the filter's lead-in before the integer delay
+    for row, delay in enumerate(delays * sample_rate):
+        assert np.allclose(signals[row, int(delay):], expected[row, int(delay):])
+
+def test_moving_emitter():
+    # an accelerating emitter over a 20 ms dwell, long enough for the fixed geometry to be wrong
+    emitter = Emitter(1090e6, np.array([10000., 20000, 9000]), np.array([250., -100, 20]), np.array([0, 30., 0]))
+    array = ReceiverArray(sample_rate, 1e-6, receiver_positions)
+    K = int(sample_rate * .02)
+    n = np.arange(K)
+    tone = .01 # cycles / sample
+    signal = np.cos(2 * np.pi * tone * n)
+
+    signals, t, f = moving_emitter_channel(signal, emitter, array.positions, sample_rate)
+
+    # every sample delayed by its own exact delay, half a sample more like the FIR delay
+    delays = propagation_delays(emitter, array.positions, n / sample_rate)
+    expected = np.cos(2 * np.pi * tone * (n - delays * sample_rate - .5)) * \
+               np.exp(-2j * np.pi * emitter.frequency * (delays - delays[:, :1]))
+    arrived = n > np.max(delays) * sample_rate + 100
+    error = np.max(np.abs(signals - expected)[:, arrived])
+
+    static, _ = array.add_time_delay(signal, emitter)
+    static, static_f = array.apply_doppler(static, emitter)
+    static_error = np.max(np.abs(static - expected)[:, arrived])
+    print(error, static_error)
+    assert error < 2 * MAX_PHASE_ERROR
+    assert static_error > 100 * error
+
+    assert np.allclose(t, delays[:, 0])
+    assert np.allclose(f, static_f, atol=.1)
+
+if __name__ == '__main__':
+    test_static_emitter()
+    test_moving_emitter()
@@ -0,0 +1,109 @@
+import numpy as np
+
+from doa_utils import fft_backend
+from doa_utils.caf import fft_caf, fft_caf_peaks, batched_fft_caf, convolution_caf
+
+def test_vectorized_fft_caf():
+    sig1 = np.random.randn(1024) + 1j * np.random.randn(1024)
+    sig2 = np.roll(sig1, 5) * np.exp(1j * 2 * np.pi * .01 * np.arange(len(sig1)))
+
+    loop_out = fft_caf(sig1, sig2, 40, vectorized=False)
+    # a small chunk forces the lag axis to be split across several batches
+    vec_out = fft_caf(sig1, sig2, 40, lag_chunk=7)
+
+    assert np.array_equal(loop_out[0], vec_out[0])
+    assert loop_out[1:] == vec_out[1:]
+    print(vec_out[1:])
+
+def test_batched_fft_caf():
+    sig1 = np.random.randn(1024) + 1j * np.random.randn(1024)
+    sigs = np.array([np.roll(sig1, 3),
+                     np.roll(sig1, -12) * np.exp(1j * 2 * np.pi * .05 * np.arange(len(sig1))),
+                     sig1])
+
+    tshifts, fshifts, max_mags, _ = batched_fft_caf(sig1, sigs, 20, lag_chunk=6)
+
+    for i, sig in enumerate(sigs):
+        _, tshift, fshift, max_mag, _ = fft_caf(sig1, sig, 20)
+        assert tshifts[i] == tshift
+        assert fshifts[i] == fshift
+        assert np.isclose(max_mags[i], max_mag)
+    print(tshifts, fshifts, max_mags)
+
+def test_fft_caf_peaks():
+    sig1 = np.random.randn(2048) + 1j * np.random.randn(2048)
+    sig2 = np.roll(sig1, -9) * np.exp(1j * 2 * np.pi * .02 * np.arange(len(sig1)))
+
+    caf_out, tshift, fshift, max_mag, median_mag = fft_caf(sig1, sig2, 30)
+    peak_tshift, peak_fshift, peak_mag, median_est, peaks = fft_caf_peaks(sig1, sig2, 30, top_k=4, lag_chunk=8)
+
+    assert (peak_tshift, peak_fshift) == (tshift, fshift)
+    assert np.isclose(peak_mag, max_mag)
+    assert np.allclose(peaks[:, 2], np.sort(np.abs(caf_out).ravel())[::-1][:4])
+    # the running estimate only has to be close to the true median
+    assert abs(median_est - median_mag) < .1 * median_mag
+    print(peaks, median_est, median_mag)
+
+def test_vectorized_convolution_caf():
+    sig1 = np.random.randn(1024) + 1j * np.random.randn(1024)
+    sig2 = np.roll(sig1, 4) * np.exp(1j * 2 * np.pi * .1 * np.arange(len(sig1)))
+
+    loop_out = convolution_caf(sig1, sig2, 301, vectorized=False)
+    vec_out = convolution_caf(sig1, sig2, 301, freq_chunk=16)
+
+    assert np.array_equal(loop_out[0], vec_out[0])
+    assert loop_out[1:] == vec_out[1:]
+
+    # a lag window keeps the same peak but only 2 * max_time_shift + 1 columns
+    window_out = convolution_caf(sig1, sig2, 301, max_time_shift=10)
+    assert window_out[0].shape == (301, 21)
+    assert window_out[1] % len(sig1) == vec_out[1] % len(sig1)
+    assert window_out[2] == vec_out[2]
+    print(vec_out[1:3], window_out[1:3])
+
+def test_fft_backends():
+    sig1 = np.random.randn(1000) + 1j * np.random.randn(1000)
+    sig2 = np.roll(sig1, 6) * np.exp(1j * 2 * np.pi * .03 * np.arange(len(sig1)))
+
+    scipy_out = fft_caf(sig1, sig2, 20)
+    fft_backend.set_backend('numpy')
+    try:
+        numpy_out = fft_caf(sig1, sig2, 20)
+        single_out = fft_caf(sig1, sig2, 20, dtype=np.complex64)
+    finally:
+        fft_backend.set_backend('scipy')
+
+    assert np.allclose(scipy_out[0], numpy_out[0])
+    assert scipy_out[1:3] == numpy_out[1:3]
+    assert single_out[0].dtype == np.complex64
+
+    # padding to a fast length only refines the frequency grid
+    tshifts, fshifts, _, _ = batched_fft_caf(sig1, sig2[None, :], 20, fast_len=True)
+    assert fft_backend.next_fast_len(1000) == 1000
+    assert fft_backend.next_fast_len(1009) > 1009
+    assert tshifts[0] == scipy_out[1]
+    assert abs(fshifts[0] - scipy_out[2]) <= 1 / len(sig1)
+
+def test_scratch_budget():
+    # the shorter last chunk reuses the full chunk's buffer
+    full = fft_backend.scratch((4, 24, 4000), np.complex128)
+    last = fft_backend.scratch((4, 17, 4000), np.complex128)
+    assert last.shape == (4, 17, 4000) and last.flags.c_contiguous
+    assert np.shares_memory(full, last)
+
+    # requests past the budget aren't cached, and the cache stays under it
+    large = fft_backend.MAX_SCRATCH_BYTES // 16 + 1
+    assert not np.shares_memory(fft_backend.scratch((large,), np.complex128),
+                                fft_backend.scratch((large,), np.complex128))
+    fft_backend.scratch((fft_backend.MAX_SCRATCH_BYTES // 16,), np.complex128)
+    fft_backend.scratch((1000,), np.complex64)
+    cached = sum(buffer.nbytes for buffer in fft_backend._scratch.buffers.values())
+    assert cached <= fft_backend.MAX_SCRATCH_BYTES
+
+if __name__ == '__main__':
+    test_vectorized_fft_caf()
+    test_batched_fft_caf()
+    test_fft_caf_peaks()
+    test_vectorized_convolution_caf()
+    test_fft_backends()
+    test_scratch_budget()